@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { clientAPI } from '../../utils/api';
+import { clientAPI, pageInfo } from '../../utils/api';
 import { 
   RequestTypes, 
   RequestPriorityTypes,
@@ -13,7 +13,10 @@ import RequestDetailModal from '../Requests/RequestDetailModal';
 
 const ClientDashboard = () => {
   const [requests, setRequests] = useState([]);
+  const [requestsCursor, setRequestsCursor] = useState(null);
+  const [requestsTotal, setRequestsTotal] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showCreateModal, setShowCreateModal] = useState(false);
   const [selectedRequestId, setSelectedRequestId] = useState(null);
   const [filters, setFilters] = useState({
@@ -27,19 +30,26 @@ const ClientDashboard = () => {
     fetchRequests();
   }, [filters]);
 
+  const requestParams = () => {
+    const params = {};
+
+    // Add filters to params if they have values, convert to integers
+    if (filters.type) params.type = Number(filters.type);
+    if (filters.status) params.status = Number(filters.status);
+    if (filters.priority) params.priority = Number(filters.priority);
+    if (filters.viewed) params.viewed = filters.viewed === 'true';
+    return params;
+  };
+
+  // Only the first page is loaded, the next ones when the user asks for them
   const fetchRequests = async () => {
     try {
       setLoading(true);
-      const params = {};
-      
-      // Add filters to params if they have values, convert to integers
-      if (filters.type) params.type = Number(filters.type);
-      if (filters.status) params.status = Number(filters.status);
-      if (filters.priority) params.priority = Number(filters.priority);
-      if (filters.viewed) params.viewed = filters.viewed === 'true';
-
-      const response = await clientAPI.getMyRequests(params);
+      const response = await clientAPI.getMyRequests({ ...requestParams(), include_total: true });
+      const { nextCursor, totalEstimate } = pageInfo(response);
       setRequests(response.data);
+      setRequestsCursor(nextCursor);
+      setRequestsTotal(totalEstimate);
     } catch (error) {
       console.error('Error fetching requests:', error);
     } finally {
@@ -47,6 +57,19 @@ const ClientDashboard = () => {
     }
   };
 
+  const loadMoreRequests = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await clientAPI.getMyRequests({ ...requestParams(), cursor: requestsCursor });
+      setRequests(prev => [...prev, ...response.data]);
+      setRequestsCursor(pageInfo(response).nextCursor);
+    } catch (error) {
+      console.error('Error fetching requests:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleRequestCreated = () => {
     setShowCreateModal(false);
     fetchRequests(); // Refresh the list
@@ -162,6 +185,19 @@ const ClientDashboard = () => {
             ))}
           </div>
         )}
+        {!loading && requests.length > 0 && (
+          <div style={styles.pageFooter}>
+            <span style={styles.pageInfo}>
+              Showing {requests.length}
+              {requestsTotal !== null && ` of about ${Math.max(requestsTotal, requests.length)}`}
+            </span>
+            {requestsCursor && (
+              <button onClick={loadMoreRequests} disabled={loadingMore} style={styles.loadMoreButton}>
+                {loadingMore ? 'Loading...' : 'Load More'}
+              </button>
+            )}
+          </div>
+        )}
       </div>
 
       {showCreateModal && (
@@ -266,6 +302,26 @@ const styles = {
     gridTemplateColumns: 'repeat(auto-fill, minmax(350px, 1fr))',
     gap: '1.5rem',
   },
+  pageFooter: {
+    display: 'flex',
+    justifyContent: 'center',
+    alignItems: 'center',
+    gap: '1rem',
+    marginTop: '1.5rem',
+  },
+  pageInfo: {
+    color: '#6b7280',
+    fontSize: '0.875rem',
+  },
+  loadMoreButton: {
+    backgroundColor: '#3b82f6',
+    color: 'white',
+    border: 'none',
+    padding: '0.5rem 1.5rem',
+    borderRadius: '4px',
+    fontSize: '0.875rem',
+    cursor: 'pointer',
+  },
 };
 
 export default ClientDashboard; 
\ No newline at end of file
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { supportAPI } from '../../utils/api';
+import { supportAPI, pageInfo } from '../../utils/api';
 import { 
   RequestTypes, 
   RequestPriorityTypes,
@@ -12,8 +12,13 @@ import SupportRequestDetailModal from '../Requests/SupportRequestDetailModal';
 
 const SupportDashboard = () => {
   const [requests, setRequests] = useState([]);
+  const [requestsCursor, setRequestsCursor] = useState(null);
+  const [requestsTotal, setRequestsTotal] = useState(null);
   const [clients, setClients] = useState([]);
+  const [clientsCursor, setClientsCursor] = useState(null);
+  const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [activeTab, setActiveTab] = useState('requests');
   const [selectedRequestId, setSelectedRequestId] = useState(null);
   const [filters, setFilters] = useState({
@@ -31,19 +36,27 @@ const SupportDashboard = () => {
     }
   }, [activeTab, filters]);
 
+  const requestParams = () => {
+    const params = {};
+
+    // Add filters to params if they have values, convert to integers
+    if (filters.type) params.type = Number(filters.type);
+    if (filters.status) params.status = Number(filters.status);
+    if (filters.priority) params.priority = Number(filters.priority);
+    if (filters.viewed) params.viewed = filters.viewed === 'true';
+    return params;
+  };
+
+  // Only the first page is loaded, the next ones when the user asks for them
   const fetchRequests = async () => {
+    fetchStats();
     try {
       setLoading(true);
-      const params = {};
-      
-      // Add filters to params if they have values, convert to integers
-      if (filters.type) params.type = Number(filters.type);
-      if (filters.status) params.status = Number(filters.status);
-      if (filters.priority) params.priority = Number(filters.priority);
-      if (filters.viewed) params.viewed = filters.viewed === 'true';
-
-      const response = await supportAPI.getAllRequests(params);
+      const response = await supportAPI.getAllRequests({ ...requestParams(), include_total: true });
+      const { nextCursor, totalEstimate } = pageInfo(response);
       setRequests(response.data);
+      setRequestsCursor(nextCursor);
+      setRequestsTotal(totalEstimate);
     } catch (error) {
       console.error('Error fetching requests:', error);
     } finally {
@@ -51,11 +64,34 @@ const SupportDashboard = () => {
     }
   };
 
+  const loadMoreRequests = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await supportAPI.getAllRequests({ ...requestParams(), cursor: requestsCursor });
+      setRequests(prev => [...prev, ...response.data]);
+      setRequestsCursor(pageInfo(response).nextCursor);
+    } catch (error) {
+      console.error('Error fetching requests:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const fetchStats = async () => {
+    try {
+      const response = await supportAPI.getStats();
+      setStats(response.data);
+    } catch (error) {
+      console.error('Error fetching stats:', error);
+    }
+  };
+
   const fetchClients = async () => {
     try {
       setLoading(true);
       const response = await supportAPI.getClients();
       setClients(response.data);
+      setClientsCursor(pageInfo(response).nextCursor);
     } catch (error) {
       console.error('Error fetching clients:', error);
     } finally {
@@ -63,6 +99,19 @@ const SupportDashboard = () => {
     }
   };
 
+  const loadMoreClients = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await supportAPI.getClients({ cursor: clientsCursor });
+      setClients(prev => [...prev, ...response.data]);
+      setClientsCursor(pageInfo(response).nextCursor);
+    } catch (error) {
+      console.error('Error fetching clients:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleFilterChange = (filterType, value) => {
     setFilters(prev => ({
       ...prev,
@@ -87,12 +136,13 @@ const SupportDashboard = () => {
     setSelectedRequestId(null);
   };
 
+  // Counts of every request from /support/stats, not of the loaded pages
   const getStatusCounts = () => {
     const counts = {
-      pending: requests.filter(r => r.status === 0).length,
-      inProcess: requests.filter(r => r.status === 1).length,
-      done: requests.filter(r => r.status === 2).length,
-      unviewed: requests.filter(r => !r.viewed).length,
+      pending: stats ? stats.status[0] : '-',
+      inProcess: stats ? stats.status[1] : '-',
+      done: stats ? stats.status[2] : '-',
+      unviewed: stats ? stats.viewed[false] : '-',
     };
     return counts;
   };
@@ -223,6 +273,19 @@ const SupportDashboard = () => {
                 ))}
               </div>
             )}
+            {!loading && requests.length > 0 && (
+              <div style={styles.pageFooter}>
+                <span style={styles.pageInfo}>
+                  Showing {requests.length}
+                  {requestsTotal !== null && ` of about ${Math.max(requestsTotal, requests.length)}`}
+                </span>
+                {requestsCursor && (
+                  <button onClick={loadMoreRequests} disabled={loadingMore} style={styles.loadMoreButton}>
+                    {loadingMore ? 'Loading...' : 'Load More'}
+                  </button>
+                )}
+              </div>
+            )}
           </div>
         </>
       )}
@@ -244,6 +307,13 @@ const SupportDashboard = () => {
                   </div>
                 ))}
               </div>
+              {clientsCursor && (
+                <div style={styles.pageFooter}>
+                  <button onClick={loadMoreClients} disabled={loadingMore} style={styles.loadMoreButton}>
+                    {loadingMore ? 'Loading...' : 'Load More'}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -373,6 +443,26 @@ const styles = {
     gridTemplateColumns: 'repeat(auto-fill, minmax(350px, 1fr))',
     gap: '1.5rem',
   },
+  pageFooter: {
+    display: 'flex',
+    justifyContent: 'center',
+    alignItems: 'center',
+    gap: '1rem',
+    marginTop: '1.5rem',
+  },
+  pageInfo: {
+    color: '#6b7280',
+    fontSize: '0.875rem',
+  },
+  loadMoreButton: {
+    backgroundColor: '#3b82f6',
+    color: 'white',
+    border: 'none',
+    padding: '0.5rem 1.5rem',
+    borderRadius: '4px',
+    fontSize: '0.875rem',
+    cursor: 'pointer',
+  },
   clientsContainer: {
     backgroundColor: 'white',
     borderRadius: '8px',
@@ -17,6 +17,11 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Time of our last write, keeps our reads on the primary database until replicas catch up
+    const lastWrite = localStorage.getItem('lastWrite');
+    if (lastWrite) {
+      config.headers['X-Last-Write'] = lastWrite;
+    }
     return config;
   },
   (error) => {
@@ -24,9 +29,15 @@ api.interceptors.request.use(
   }
 );
 
-// Response interceptor to handle token expiration
+// Response interceptor to remember write times and handle token expiration
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const lastWrite = response.headers['x-last-write'];
+    if (lastWrite) {
+      localStorage.setItem('lastWrite', lastWrite);
+    }
+    return response;
+  },
   (error) => {
     if (error.response?.status === 401) {
       localStorage.removeItem('token');
@@ -37,6 +48,16 @@ api.interceptors.response.use(
   }
 );
 
+// Lists come in pages: the next one is fetched with the cursor from X-Next-Cursor,
+// X-Total-Count-Estimate comes back when the list is asked for with include_total
+export const pageInfo = (response) => {
+  const total = response.headers['x-total-count-estimate'];
+  return {
+    nextCursor: response.headers['x-next-cursor'] || null,
+    totalEstimate: total !== undefined ? Number(total) : null,
+  };
+};
+
 // Auth API calls
 export const authAPI = {
   signup: (userData) => api.post('/auth/signup', userData),
@@ -55,9 +76,10 @@ export const clientAPI = {
 // Support API calls
 export const supportAPI = {
   getAllRequests: (params) => api.get('/support/requests/', { params }),
-  getClients: () => api.get('/support/clients/'),
+  getClients: (params) => api.get('/support/clients/', { params }),
   getSingleRequest: (requestId) => api.get(`/support/request/${requestId}`),
   updateRequestStatus: (requestId, statusData) => api.put(`/support/request/${requestId}/status`, statusData),
+  getStats: () => api.get('/support/stats'),
 };
 
 export default api; 
\ No newline at end of file
@@ -17,4 +17,14 @@ class RequestStatus(Enum):
 class RequestPriorityTypes(Enum):
     CAN_WAIT = 0
     MIDDLE = 1
-    IMPORTANT = 2
\ No newline at end of file
+    IMPORTANT = 2
+
+class BulkStatusResultTypes(str, Enum):
+    UPDATED = "updated"
+    NOT_FOUND = "not_found"
+    UNCHANGED = "unchanged"
+
+class BatchGetResultTypes(str, Enum):
+    FOUND = "found"
+    NOT_FOUND = "not_found"
+    FORBIDDEN = "forbidden"
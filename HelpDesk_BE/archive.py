@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from classes.Request import Request
+from classes.ClientRequest import ClientRequest
+from classes.ArchivedRequest import ArchivedRequest
+from classes.ArchivedClientRequest import ArchivedClientRequest
+from database import AsyncSessionLocal
+from Enums import RequestStatus
+from etags import bump_versions, request_scopes
+from queries import request_clients_query
+
+logger = logging.getLogger(__name__)
+
+# Hot/cold split: DONE requests created more than ARCHIVE_AFTER_DAYS ago move with their
+# client_requests links to the archive tables of migration 0008, one batch per transaction.
+# The live tables and indexes keep only the working set; archived requests are read with
+# include_archived, see queries.with_archived. Stats keep counting them, ETags are bumped.
+
+# 0 turns the background job off, `manage.py archive` still works
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
+REQUEST_COLUMNS = [column.name for column in Request.__table__.columns]
+LINK_COLUMNS = [column.name for column in ClientRequest.__table__.columns]
+
+def archivable_query(dialect_name: str, cutoff: datetime, batch_size: int):
+
+    query = select(Request.id).where(
+        Request.status == RequestStatus.DONE, Request.created_at < cutoff
+    ).order_by(Request.id).limit(batch_size)
+    if dialect_name != "postgresql":
+        # SQLite hands the highest id out again once its row is gone, keep the newest request
+        query = query.where(Request.id < select(func.max(Request.id)).scalar_subquery())
+    # Workers archiving at the same time take different batches
+    return query.with_for_update(skip_locked=True)
+
+async def archive_batch(db: AsyncSession, cutoff: datetime, batch_size: int) -> int:
+
+    ids: List[int] = (await db.scalars(archivable_query(db.bind.dialect.name, cutoff, batch_size))).all()
+    if not ids:
+        return 0
+
+    owners = dict((await db.execute(request_clients_query(ids))).all())
+    await db.execute(insert(ArchivedRequest).from_select(
+        REQUEST_COLUMNS, select(*Request.__table__.columns).where(Request.id.in_(ids))
+    ))
+    await db.execute(insert(ArchivedClientRequest).from_select(
+        LINK_COLUMNS, select(*ClientRequest.__table__.columns).where(ClientRequest.request_id.in_(ids))
+    ))
+    # Links first, SQLite does not cascade without the foreign_keys pragma
+    await db.execute(delete(ClientRequest).where(ClientRequest.request_id.in_(ids)))
+    await db.execute(delete(Request).where(Request.id.in_(ids)))
+    # Archived requests leave the default lists
+    await bump_versions(db, request_scopes(owners.values()))
+    await db.commit()
+    return len(ids)
+
+async def archive_requests(after_days: int, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+
+    # Moves every archivable request, returns how many
+    cutoff = datetime.now(timezone.utc) - timedelta(days=after_days)
+    total = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            moved = await archive_batch(db, cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+class ArchiveJob:
+
+    def __init__(self, after_days: int, interval: float):
+        self.after_days = after_days
+        self.interval = interval
+        self._task = None
+
+    async def _run(self):
+
+        while True:
+            try:
+                archived = await archive_requests(self.after_days)
+                if archived:
+                    logger.info("Archived %d requests", archived)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Archiving requests failed, retrying on the next interval")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+
+        if self.after_days > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+archive_job = ArchiveJob(after_days=ARCHIVE_AFTER_DAYS, interval=ARCHIVE_INTERVAL_SECONDS)
@@ -1,16 +1,22 @@
-from datetime import datetime, timedelta
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from classes.User import User
 from classes.Client import Client
 from classes.SupportUser import SupportUser
-from pydanticModels import TokenData
+from pydanticModels import TokenData, CurrentUser
 from Enums import UserTypes
+from ttlcache import TTLCache
+from hashing import hash_pool, HashPoolFull, verify_and_update, get_password_hash
+from etags import bump_versions, CLIENTS_SCOPE
+from events import hub, publish, USER_REVOKED_EVENT
 import os
 from dotenv import load_dotenv
 
@@ -21,19 +27,43 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # JWT Bearer token scheme
 security = HTTPBearer()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    
-    return pwd_context.verify(plain_password, hashed_password)
+# Principals resolved from tokens, authenticated requests skip the JWT decode and the DB
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
 
-def get_password_hash(password: str) -> str:
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
 
-    return pwd_context.hash(password)
+async def run_hashing(func, *args):
+
+    # bcrypt runs in the hashing process pool, shed load once its queue is full
+    try:
+        return await hash_pool.run(func, *args)
+    except HashPoolFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, please retry",
+            headers={"Retry-After": "1"}
+        )
+    except BrokenProcessPool:
+        # The pool broke again right after being replaced, the next request starts a new one
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is temporarily unavailable, please retry",
+            headers={"Retry-After": "1"}
+        )
+
+def token_claims(user: User) -> dict:
+
+    # Identity travels in the token so requests can be authorized without a DB lookup
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "type": user.userType.value,
+        "name": user.name,
+    }
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     
@@ -42,7 +72,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -53,25 +83,67 @@ def verify_token(token: str, credentials_exception):
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
+        token_data = TokenData(
+            email=email,
+            id=payload.get("uid"),
+            userType=payload.get("type"),
+            name=payload.get("name"),
+            issued_at=payload.get("iat"),
+            expires_at=payload.get("exp")
+        )
+    except (JWTError, ValueError):
         raise credentials_exception
     return token_data
 
-def get_user_by_email(db: Session, email: str):
+def invalidate_user(user_id: int):
+
+    # Drop cached principals of a user, e.g. after a profile change
+    for token, principal in principal_cache.items():
+        if principal.id == user_id:
+            principal_cache.pop(token)
+
+async def revoke_user(db: AsyncSession, user_id: int):
+
+    # Reject every token issued so far for a user, e.g. after a role change or deletion.
+    # The time is stored on the user, where every worker checks it before caching a principal.
+    # Cached principals are dropped at commit by the workers that get the event (all of them
+    # with the PostgreSQL events backend), the others drop them within PRINCIPAL_CACHE_TTL_SECONDS
+    await db.execute(
+        update(User).where(User.id == user_id).values(tokens_revoked_at=datetime.now(timezone.utc))
+    )
+    await publish(db, [{"event": USER_REVOKED_EVENT, "user_id": user_id}])
+
+def is_revoked(revoked_at: Optional[datetime], issued_at: Optional[int]) -> bool:
+
+    if revoked_at is None:
+        return False
+    # SQLite hands UTC back without the zone
+    if revoked_at.tzinfo is None:
+        revoked_at = revoked_at.replace(tzinfo=timezone.utc)
+    return issued_at is None or issued_at <= revoked_at.timestamp()
+
+hub.handlers[USER_REVOKED_EVENT] = lambda item: invalidate_user(item["user_id"])
+
+async def get_user_by_email(db: AsyncSession, email: str):
     
-    return db.query(User).filter(User.email == email).first()
+    return await db.scalar(select(User).where(User.email == email))
 
-def authenticate_user(db: Session, email: str, password: str):
+async def authenticate_user(db: AsyncSession, email: str, password: str):
     
-    user = get_user_by_email(db, email)
+    user = await get_user_by_email(db, email)
     if not user:
         return False
-    if not verify_password(password, user.password):
+    valid, new_hash = await run_hashing(verify_and_update, password, user.password)
+    if not valid:
         return False
+    # Transparently rehash when the configured bcrypt cost has changed
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
     return user
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_current_user(response: Response, credentials: HTTPAuthorizationCredentials = Depends(security),
+                           db: AsyncSession = Depends(get_async_db)):
     
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -80,13 +152,40 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     )
     
     token = credentials.credentials
+    principal = principal_cache.get(token)
+    if principal is not None:
+        # Commits of this request pin the client's reads to the primary, see replicas.py
+        db.info["response"] = response
+        return principal
+
     token_data = verify_token(token, credentials_exception)
-    user = get_user_by_email(db, email=token_data.email)
-    if user is None:
-        raise credentials_exception
-    return user
+    if token_data.id is not None and token_data.userType is not None:
+        # Once per token and cache lifetime: deleted users and revoked tokens are rejected
+        # by every worker, the identity itself comes from the claims
+        revoked_at = (await db.execute(
+            select(User.tokens_revoked_at).where(User.id == token_data.id)
+        )).first()
+        if revoked_at is None or is_revoked(revoked_at[0], token_data.issued_at):
+            raise credentials_exception
+        principal = CurrentUser(
+            id=token_data.id,
+            name=token_data.name or "",
+            email=token_data.email,
+            userType=token_data.userType
+        )
+    else:
+        # Tokens issued before the identity claims existed are resolved from the DB
+        user = await get_user_by_email(db, email=token_data.email)
+        if user is None or is_revoked(user.tokens_revoked_at, token_data.issued_at):
+            raise credentials_exception
+        principal = CurrentUser.model_validate(user, from_attributes=True)
+
+    ttl = token_data.expires_at - time.time() if token_data.expires_at else None
+    principal_cache.set(token, principal, ttl=ttl)
+    db.info["response"] = response
+    return principal
 
-def get_current_client(current_user: User = Depends(get_current_user)):
+async def get_current_client(current_user: CurrentUser = Depends(get_current_user)):
     
     if current_user.userType != UserTypes.CLIENT:
         raise HTTPException(
@@ -95,7 +194,7 @@ def get_current_client(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
-def get_current_support_user(current_user: User = Depends(get_current_user)):
+async def get_current_support_user(current_user: CurrentUser = Depends(get_current_user)):
     
     if current_user.userType != UserTypes.SUPPORT:
         raise HTTPException(
@@ -104,9 +203,9 @@ def get_current_support_user(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
-def create_user(db: Session, name: str, email: str, password: str) -> User:
+async def create_user(db: AsyncSession, name: str, email: str, password: str) -> User:
 
-    hashed_password = get_password_hash(password)
+    hashed_password = await run_hashing(get_password_hash, password)
     
     # If email includes @support, it is support user; else, it is Client
     if "@support" in email.lower():
@@ -125,6 +224,8 @@ def create_user(db: Session, name: str, email: str, password: str) -> User:
         )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    if user.userType == UserTypes.CLIENT:
+        await bump_versions(db, [CLIENTS_SCOPE])
+    await db.commit()
+    await db.refresh(user)
     return user 
\ No newline at end of file
@@ -0,0 +1,91 @@
+# List endpoint serialization: ORM objects + response model + json versus the
+# column rows + orjson fast path, on a throwaway SQLite database
+#
+#   cd HelpDesk_BE && python -m benchmarks.bench_list_serialization --rows 1000 10000 100000
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from classes.Request import Request
+from Enums import RequestTypes, RequestStatus, RequestPriorityTypes
+from pydanticModels import SupportGetAllRequestsResponse
+from serialization import model_columns
+
+
+def seed(session: Session, rows: int):
+
+    session.execute(Request.__table__.delete())
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    session.execute(insert(Request), [
+        {
+            "type": list(RequestTypes)[index % 3],
+            "request": f"Ticket {index}: the export page fails for invoices older than a year",
+            "status": list(RequestStatus)[index % 3],
+            "priority": list(RequestPriorityTypes)[index % 3],
+            "viewed": index % 2 == 0,
+            "created_at": start + timedelta(seconds=index),
+        }
+        for index in range(rows)
+    ])
+    session.commit()
+
+def model_path(session: Session, adapter: TypeAdapter) -> tuple:
+
+    # What the list endpoints did: ORM objects, response model validation, json encoder
+    started = time.perf_counter()
+    requests = session.scalars(select(Request).order_by(Request.created_at.desc(), Request.id.desc())).all()
+    fetched = time.perf_counter()
+    content = adapter.dump_python(adapter.validate_python(requests, from_attributes=True), mode="json")
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+    session.expunge_all()
+    return fetched - started, time.perf_counter() - fetched, len(body)
+
+def fast_path(session: Session) -> tuple:
+
+    started = time.perf_counter()
+    rows = session.execute(
+        select(*model_columns(Request, SupportGetAllRequestsResponse)).order_by(Request.created_at.desc(), Request.id.desc())
+    ).all()
+    fetched = time.perf_counter()
+    body = orjson.dumps([row._asdict() for row in rows], option=orjson.OPT_UTC_Z)
+    return fetched - started, time.perf_counter() - fetched, len(body)
+
+def best_of(repeat: int, func, *args) -> tuple:
+
+    return min((func(*args) for _ in range(repeat)), key=lambda timing: timing[0] + timing[1])
+
+def main():
+
+    parser = argparse.ArgumentParser(description="List response serialization, model path versus fast path")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size, the fastest is reported")
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(List[SupportGetAllRequestsResponse])
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Request.__table__.create(engine)
+
+        print(f"{'rows':>8} {'path':>6} {'fetch ms':>9} {'encode ms':>10} {'total ms':>9} {'speedup':>8}")
+        with Session(engine) as session:
+            for rows in args.rows:
+                seed(session, rows)
+                model_fetch, model_encode, model_size = best_of(args.repeat, model_path, session, adapter)
+                fast_fetch, fast_encode, fast_size = best_of(args.repeat, fast_path, session)
+                model_total = model_fetch + model_encode
+                fast_total = fast_fetch + fast_encode
+                print(f"{rows:>8} {'model':>6} {model_fetch * 1000:>9.1f} {model_encode * 1000:>10.1f} {model_total * 1000:>9.1f} {1.0:>8.2f}")
+                print(f"{rows:>8} {'fast':>6} {fast_fetch * 1000:>9.1f} {fast_encode * 1000:>10.1f} {fast_total * 1000:>9.1f} {model_total / fast_total:>8.2f}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Login throughput of the bcrypt process pool for 1..N workers
+#
+#   cd HelpDesk_BE && python -m benchmarks.bench_password_hashing --rounds 12 --logins 64
+
+import argparse
+import asyncio
+import os
+import time
+from hashing import HashPool, verify_password, pwd_context
+
+
+async def run_logins(pool: HashPool, hashed: str, logins: int) -> float:
+
+    started = time.perf_counter()
+    await asyncio.gather(*[pool.run(verify_password, "password", hashed) for _ in range(logins)])
+    return time.perf_counter() - started
+
+def main():
+
+    parser = argparse.ArgumentParser(description="bcrypt login throughput per hashing pool size")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    parser.add_argument("--logins", type=int, default=64, help="Concurrent logins per run")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    hashed = pwd_context.hash("password", rounds=args.rounds)
+
+    # Inline baseline, what every login cost the API before the pool
+    started = time.perf_counter()
+    for _ in range(args.logins):
+        verify_password("password", hashed)
+    inline = time.perf_counter() - started
+    print(f"{'workers':>8} {'logins/s':>10} {'speedup':>8}")
+    print(f"{'inline':>8} {args.logins / inline:>10.1f} {1.0:>8.2f}")
+
+    sizes = sorted({2 ** power for power in range(args.max_workers.bit_length()) if 2 ** power <= args.max_workers} | {args.max_workers})
+    for workers in sizes:
+        pool = HashPool(size=workers, queue_limit=args.logins)
+        try:
+            # Warm up so process start-up is not measured
+            asyncio.run(run_logins(pool, hashed, workers))
+            elapsed = asyncio.run(run_logins(pool, hashed, args.logins))
+        finally:
+            pool.shutdown()
+        print(f"{workers:>8} {args.logins / elapsed:>10.1f} {inline / elapsed:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# Mixed client/support load against data from benchmarks.seed, in-process through
+# httpx's ASGI transport or against a running server. Reports p50/p95/p99 latency and
+# throughput per endpoint and fails (exit 1) when results regress past a baseline.
+#
+#   cd HelpDesk_BE && python -m benchmarks.seed --reset
+#   python -m benchmarks.load --duration 30 --baseline benchmarks/baseline.json
+#   python -m benchmarks.load --url http://127.0.0.1:8000 --concurrency 32
+#   python -m benchmarks.load --save-baseline benchmarks/baseline.json
+#
+# Baselines only compare runs of the same machine, database and seed; regenerate the
+# stored one with --save-baseline where the check is enforced. benchmarks/baseline.json
+# was recorded in-process against a local PostgreSQL seeded with the defaults, with
+# BCRYPT_ROUNDS=4 so logins do not dominate the mix.
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+import httpx
+from sqlalchemy import make_url
+from benchmarks.seed import PASSWORD, client_email, support_email
+
+# (operation, role, weight): roughly what the dashboards do
+WORKLOAD = [
+    ("client_list", "client", 22),
+    ("client_detail", "client", 10),
+    ("client_create", "client", 5),
+    ("client_update", "client", 3),
+    ("support_list", "support", 20),
+    ("support_list_filtered", "support", 10),
+    ("support_search", "support", 5),
+    ("support_detail", "support", 10),
+    ("support_status", "support", 5),
+    ("support_stats", "support", 5),
+    ("support_clients", "support", 3),
+    ("login", "any", 2),
+]
+
+PAGE_SIZE = 50
+
+# Regression thresholds, relative to the baseline
+DEFAULT_TOLERANCE = 0.25
+MIN_SAMPLES = 20
+
+
+class VirtualUser:
+
+    def __init__(self, email: str, role: str, token: str, request_ids: List[int]):
+        self.email = email
+        self.role = role
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.request_ids = request_ids
+
+
+async def login(client: httpx.AsyncClient, email: str) -> str:
+
+    response = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def run_operation(client: httpx.AsyncClient, operation: str, user: VirtualUser, rng: random.Random, max_id: int) -> httpx.Response:
+
+    if operation == "client_list":
+        return await client.get("/client/my-requests/", params={"limit": PAGE_SIZE}, headers=user.headers)
+    if operation == "client_detail":
+        return await client.get(f"/client/request/{rng.choice(user.request_ids)}", headers=user.headers)
+    if operation == "client_create":
+        response = await client.post("/client/request/", headers=user.headers, json={
+            "type": rng.randrange(3), "priority": rng.randrange(3),
+            "request": f"Load test ticket {rng.randrange(10 ** 9)}: the report page is slow",
+        })
+        if response.status_code == 200:
+            user.request_ids.append(response.json()["id"])
+        return response
+    if operation == "client_update":
+        return await client.put(f"/client/request/{rng.choice(user.request_ids)}", headers=user.headers,
+                                json={"priority": rng.randrange(3)})
+    if operation == "support_list":
+        return await client.get("/support/requests/", params={"limit": PAGE_SIZE}, headers=user.headers)
+    if operation == "support_list_filtered":
+        return await client.get("/support/requests/", headers=user.headers, params={
+            "limit": PAGE_SIZE, "status": 0, "priority": rng.randrange(3), "sort_by": "priority"
+        })
+    if operation == "support_search":
+        term = rng.choice(["login", "invoice", "export", "dashboard", "report"])
+        return await client.get("/support/requests/", params={"limit": PAGE_SIZE, "q": term}, headers=user.headers)
+    if operation == "support_detail":
+        return await client.get(f"/support/request/{rng.randint(1, max_id)}", headers=user.headers)
+    if operation == "support_status":
+        return await client.put(f"/support/request/{rng.randint(1, max_id)}/status", headers=user.headers,
+                                json={"status": rng.randrange(3)})
+    if operation == "support_stats":
+        return await client.get("/support/stats", headers=user.headers)
+    if operation == "support_clients":
+        return await client.get("/support/clients/", params={"limit": PAGE_SIZE}, headers=user.headers)
+    if operation == "login":
+        return await client.post("/auth/login", json={"email": user.email, "password": PASSWORD})
+    raise ValueError(operation)
+
+async def prepare_users(client: httpx.AsyncClient, clients: int, support_users: int) -> List[VirtualUser]:
+
+    users = []
+    for index in range(clients):
+        email = client_email(index)
+        token = await login(client, email)
+        page = await client.get("/client/my-requests/", params={"limit": PAGE_SIZE}, headers={"Authorization": f"Bearer {token}"})
+        page.raise_for_status()
+        request_ids = [request["id"] for request in page.json()]
+        # Clients without tickets still create and list them
+        users.append(VirtualUser(email, "client", token, request_ids))
+    for index in range(support_users):
+        email = support_email(index)
+        users.append(VirtualUser(email, "support", await login(client, email), []))
+    return users
+
+async def worker(client: httpx.AsyncClient, users: List[VirtualUser], rng: random.Random, deadline: float,
+                 max_id: int, latencies: Dict[str, List[float]], errors: Dict[str, int]):
+
+    operations = [operation for operation, _, _ in WORKLOAD]
+    weights = [weight for _, _, weight in WORKLOAD]
+    roles = {operation: role for operation, role, _ in WORKLOAD}
+
+    while time.perf_counter() < deadline:
+        operation = rng.choices(operations, weights=weights)[0]
+        role = roles[operation]
+        candidates = [user for user in users if role == "any" or user.role == role]
+        user = rng.choice(candidates)
+        if operation in ("client_detail", "client_update") and not user.request_ids:
+            operation = "client_create"
+
+        started = time.perf_counter()
+        try:
+            response = await run_operation(client, operation, user, rng, max_id)
+            ok = response.status_code < 400 or (operation.startswith("support_") and response.status_code == 404)
+        except httpx.HTTPError:
+            ok = False
+        latencies[operation].append(time.perf_counter() - started)
+        if not ok:
+            errors[operation] += 1
+
+def percentile(samples: List[float], fraction: float) -> float:
+
+    # Nearest-rank percentile
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> dict:
+
+    endpoints = {}
+    for operation, samples in sorted(latencies.items()):
+        endpoints[operation] = {
+            "count": len(samples),
+            "errors": errors.get(operation, 0),
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+        }
+    total = sum(len(samples) for samples in latencies.values())
+    return {"elapsed_s": round(elapsed, 2), "requests": total, "throughput_rps": round(total / elapsed, 2), "endpoints": endpoints}
+
+def print_report(result: dict):
+
+    print(f"{'endpoint':<24} {'count':>7} {'errors':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for operation, row in result["endpoints"].items():
+        print(f"{operation:<24} {row['count']:>7} {row['errors']:>6} {row['rps']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+    print(f"{'total':<24} {result['requests']:>7} {'':>6} {result['throughput_rps']:>8.1f}")
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> List[str]:
+
+    # p95 per endpoint and overall throughput, endpoints with too few samples are skipped
+    failures = []
+    for operation, row in result["endpoints"].items():
+        reference = baseline["endpoints"].get(operation)
+        if row["errors"]:
+            failures.append(f"{operation}: {row['errors']} failed requests")
+        if reference is None or row["count"] < MIN_SAMPLES or reference["count"] < MIN_SAMPLES:
+            continue
+        if row["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+            failures.append(f"{operation}: p95 {row['p95_ms']:.1f}ms, baseline {reference['p95_ms']:.1f}ms")
+    if result["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        failures.append(f"throughput {result['throughput_rps']:.1f} rps, baseline {baseline['throughput_rps']:.1f} rps")
+    return failures
+
+@asynccontextmanager
+async def http_client(url: Optional[str]):
+
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+            yield client
+        return
+
+    # In-process: the app, its lifespan and the database from .env, no network in between.
+    # Seeded tickets are all past the archive age, keep the archive job from moving them mid-run
+    os.environ.setdefault("ARCHIVE_AFTER_DAYS", "0")
+    import main
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=30) as client:
+            yield client
+
+async def run(args) -> dict:
+
+    async with http_client(args.url) as client:
+        users = await prepare_users(client, args.clients, args.support)
+        newest = await client.get("/support/requests/", params={"limit": 1}, headers=next(
+            user.headers for user in users if user.role == "support"
+        ))
+        newest.raise_for_status()
+        max_id = newest.json()[0]["id"] if newest.json() else 1
+
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            worker(client, users, random.Random(args.seed * 1000 + index), deadline, max_id, latencies, errors)
+            for index in range(args.concurrency)
+        ])
+        return summarize(latencies, errors, time.perf_counter() - started)
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Mixed client/support load test")
+    parser.add_argument("--url", help="Base URL of a running server, the app runs in-process when omitted")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent virtual users")
+    parser.add_argument("--clients", type=int, default=50, help="Seeded clients to log in as")
+    parser.add_argument("--support", type=int, default=5, help="Seeded support users to log in as")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the operation mix")
+    parser.add_argument("--baseline", help="Fail when p95 or throughput regress past this baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative regression")
+    parser.add_argument("--save-baseline", help="Write the results as the new baseline")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    if args.save_baseline:
+        result["parameters"] = {
+            "url": args.url or "in-process", "duration": args.duration, "concurrency": args.concurrency,
+            "clients": args.clients, "support": args.support, "seed": args.seed,
+        }
+        if not args.url:
+            from database import DB_URL
+            from hashing import BCRYPT_ROUNDS
+            result["parameters"].update(database=make_url(DB_URL).get_backend_name(), bcrypt_rounds=BCRYPT_ROUNDS)
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump(result, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            failures = regressions(result, json.load(baseline_file), args.tolerance)
+        if failures:
+            print(f"Regressed past the baseline (tolerance {args.tolerance:.0%}):")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print("Within the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# Deterministic test data for the load tests: the same --seed always produces the
+# same users, tickets and timestamps, against the database configured in .env
+#
+#   cd HelpDesk_BE && python -m benchmarks.seed --clients 200 --support 10 --tickets 20000 --reset
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from database import engine
+from classes.User import User
+from classes.Client import Client
+from classes.SupportUser import SupportUser
+from classes.Request import Request
+from classes.ClientRequest import ClientRequest
+from classes.ArchivedRequest import ArchivedRequest
+from classes.ArchivedClientRequest import ArchivedClientRequest
+from classes.RequestStat import RequestStat
+from classes.ScopeVersion import ScopeVersion
+from classes.IdempotencyKey import IdempotencyKey
+from Enums import UserTypes, RequestTypes, RequestStatus, RequestPriorityTypes
+from hashing import get_password_hash
+from migrate import run_migrations
+from stats import reconcile_stats
+
+# Every seeded user logs in with this password
+PASSWORD = "benchmark-password"
+
+# Rough shape of a real queue: most tickets are closed, few are urgent
+STATUS_WEIGHTS = {RequestStatus.PENDING: 0.25, RequestStatus.IN_PROCESS: 0.15, RequestStatus.DONE: 0.60}
+PRIORITY_WEIGHTS = {RequestPriorityTypes.CAN_WAIT: 0.45, RequestPriorityTypes.MIDDLE: 0.40, RequestPriorityTypes.IMPORTANT: 0.15}
+TYPE_WEIGHTS = {RequestTypes.REVIEW: 0.35, RequestTypes.DEVELOPMENT: 0.45, RequestTypes.DISCUSS: 0.20}
+# Chance that support already opened a ticket, per status
+VIEWED_CHANCE = {RequestStatus.PENDING: 0.3, RequestStatus.IN_PROCESS: 1.0, RequestStatus.DONE: 1.0}
+
+SUBJECTS = ["login", "invoice", "export", "dashboard", "password reset", "report", "API token", "notification", "search", "upload"]
+PROBLEMS = ["fails with an error", "is very slow", "shows wrong numbers", "times out", "does not load", "needs a new option"]
+
+INSERT_BATCH_SIZE = 5000
+
+# Tickets are spread over the days before this date, wall-clock time never leaks in
+SEED_END = datetime(2025, 7, 1, tzinfo=timezone.utc)
+
+def client_email(index: int) -> str:
+
+    return f"client{index}@example.com"
+
+def support_email(index: int) -> str:
+
+    return f"agent{index}@support.example.com"
+
+def pick(rng: random.Random, weights: dict):
+
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+def ticket_text(rng: random.Random, number: int) -> str:
+
+    subject = rng.choice(SUBJECTS)
+    return f"#{number} The {subject} page {rng.choice(PROBLEMS)} since the last update. " \
+           f"Steps: open {subject}, apply the usual filters, wait. Expected it to work as before."
+
+def reset(session: Session):
+
+    for model in (IdempotencyKey, ArchivedClientRequest, ArchivedRequest, ClientRequest, Request, RequestStat, Client, SupportUser, User):
+        session.execute(delete(model))
+    session.commit()
+
+def seed(session: Session, clients: int, support_users: int, tickets: int, seed_value: int, days: int):
+
+    rng = random.Random(seed_value)
+    # One bcrypt hash for everybody, hashing per user would dominate the run
+    password = get_password_hash(PASSWORD)
+
+    session.execute(insert(Client), [
+        {"name": f"Client {index}", "email": client_email(index), "password": password, "userType": UserTypes.CLIENT}
+        for index in range(clients)
+    ])
+    session.execute(insert(SupportUser), [
+        {"name": f"Agent {index}", "email": support_email(index), "password": password, "userType": UserTypes.SUPPORT}
+        for index in range(support_users)
+    ])
+    client_ids = session.scalars(select(User.id).where(User.userType == UserTypes.CLIENT).order_by(User.id)).all()
+
+    # A few clients file most of the tickets
+    client_weights = [1 / (rank + 1) for rank in range(len(client_ids))]
+    start = SEED_END - timedelta(days=days)
+    offsets = sorted(rng.uniform(0, days * 86400) for _ in range(tickets))
+
+    for batch_start in range(0, tickets, INSERT_BATCH_SIZE):
+        batch = []
+        owners = []
+        for number in range(batch_start, min(batch_start + INSERT_BATCH_SIZE, tickets)):
+            status = pick(rng, STATUS_WEIGHTS)
+            batch.append({
+                "type": pick(rng, TYPE_WEIGHTS),
+                "request": ticket_text(rng, number),
+                "status": status,
+                "priority": pick(rng, PRIORITY_WEIGHTS),
+                "viewed": rng.random() < VIEWED_CHANCE[status],
+                "created_at": start + timedelta(seconds=int(offsets[number])),
+            })
+            owners.append(rng.choices(client_ids, weights=client_weights)[0])
+
+        request_ids = session.scalars(
+            insert(Request).returning(Request.id, sort_by_parameter_order=True), batch
+        ).all()
+        session.execute(insert(ClientRequest), [
+            {"client_id": client_id, "request_id": request_id} for client_id, request_id in zip(owners, request_ids)
+        ])
+    session.commit()
+
+    # Bulk inserts bypass the API: invalidate cached ETags and rebuild the stats counters
+    session.execute(update(ScopeVersion).values(version=ScopeVersion.version + 1))
+    reconcile_stats(session)
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Seed deterministic users and tickets for the load tests")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--support", type=int, default=10, help="Support users")
+    parser.add_argument("--tickets", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=365, help="Spread ticket creation over this many days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Delete all users and tickets first")
+    args = parser.parse_args()
+
+    run_migrations()
+    started = time.perf_counter()
+    with Session(engine) as session:
+        if args.reset:
+            reset(session)
+        seed(session, args.clients, args.support, args.tickets, args.seed, args.days)
+    print(f"Seeded {args.clients} clients, {args.support} support users and {args.tickets} tickets "
+          f"in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+from database import Base
+from sqlalchemy import Column, Integer, ForeignKey, Index
+
+
+class ArchivedClientRequest(Base):
+    __tablename__ = "archived_client_requests"
+
+    # client_requests links of the archived requests, ids kept
+    id = Column(Integer, primary_key=True, nullable=False, autoincrement=False)
+    client_id = Column(
+        Integer,
+        ForeignKey('clients.id', ondelete='CASCADE'),
+        nullable=False,
+        )
+    request_id = Column(
+        Integer,
+        ForeignKey('archived_requests.id', ondelete='CASCADE'),
+        nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_archived_client_requests_client_id_request_id", "client_id", "request_id"),
+        Index("ix_archived_client_requests_request_id", "request_id"),
+    )
@@ -0,0 +1,24 @@
+from database import Base, SQLiteTimestamp
+from sqlalchemy import Column, Integer, String, Boolean, TIMESTAMP, ForeignKey, Index, func, text
+from sqlalchemy import Enum as SQLEnum
+from Enums import RequestTypes, RequestStatus, RequestPriorityTypes
+
+
+class ArchivedRequest(Base):
+    __tablename__ = "archived_requests"
+
+    # Same columns as requests, rows keep their id when archive.py moves them here
+    id = Column(Integer, primary_key=True, nullable=False, autoincrement=False)
+    type = Column(SQLEnum(RequestTypes), nullable=False)
+    request = Column(String, nullable=False)
+    status = Column(SQLEnum(RequestStatus), nullable=False)
+    priority = Column(SQLEnum(RequestPriorityTypes), nullable=False)
+    viewed = Column(Boolean, nullable=False, server_default=text('false'))
+    created_at = Column(TIMESTAMP(timezone=True).with_variant(SQLiteTimestamp, 'sqlite'))
+    claimed_by = Column(Integer, ForeignKey('support_users.id', ondelete='SET NULL'), nullable=True)
+    claimed_at = Column(TIMESTAMP(timezone=True).with_variant(SQLiteTimestamp, 'sqlite'), nullable=True)
+    archived_at = Column(TIMESTAMP(timezone=True).with_variant(SQLiteTimestamp, 'sqlite'), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_archived_requests_created_at_id", "created_at", "id"),
+    )
@@ -1,5 +1,5 @@
 from database import Base
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 
 
 class ClientRequest(Base):
@@ -17,3 +17,8 @@ class ClientRequest(Base):
         nullable=False,
         autoincrement=True
     )
+
+    __table_args__ = (
+        Index("ix_client_requests_client_id_request_id", "client_id", "request_id"),
+        Index("ix_client_requests_request_id", "request_id"),
+    )
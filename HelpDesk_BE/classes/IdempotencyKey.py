@@ -0,0 +1,23 @@
+from database import Base, SQLiteTimestamp
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey, Index, func
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # Idempotency-Key of a client's ticket creation and the response it got, see idempotency.py
+    client_id = Column(
+        Integer,
+        ForeignKey('clients.id', ondelete='CASCADE'),
+        primary_key=True,
+        nullable=False
+    )
+    key = Column(String(255), primary_key=True, nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    # Written in the creating transaction, NULL only until it commits
+    response = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True).with_variant(SQLiteTimestamp, 'sqlite'), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_created_at", "created_at"),
+    )
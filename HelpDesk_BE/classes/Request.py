@@ -1,5 +1,5 @@
-from database import Base
-from sqlalchemy import Column, Integer, String, Boolean, TIMESTAMP, text
+from database import Base, SQLiteTimestamp
+from sqlalchemy import Column, Integer, String, Boolean, TIMESTAMP, ForeignKey, Index, desc, func, text
 from sqlalchemy import Enum as SQLEnum
 from Enums import RequestTypes, RequestStatus, RequestPriorityTypes
 
@@ -13,4 +13,18 @@ class Request(Base):
     status = Column(SQLEnum(RequestStatus), nullable=False, server_default=text(f"'{RequestStatus.PENDING.name}'"))
     priority = Column(SQLEnum(RequestPriorityTypes), nullable=False)
     viewed = Column(Boolean, nullable=False, server_default=text('false'))
-    created_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'))
\ No newline at end of file
+    created_at = Column(TIMESTAMP(timezone=True).with_variant(SQLiteTimestamp, 'sqlite'), server_default=func.now())
+    # Support user that took the ticket from the queue
+    claimed_by = Column(Integer, ForeignKey('support_users.id', ondelete='SET NULL'), nullable=True)
+    claimed_at = Column(TIMESTAMP(timezone=True).with_variant(SQLiteTimestamp, 'sqlite'), nullable=True)
+
+    # Composite indexes for the list filters and keyset ordering, see migrations/versions
+    __table_args__ = (
+        Index("ix_requests_status_priority_created_at", "status", "priority", "created_at", "id"),
+        Index("ix_requests_viewed_created_at", "viewed", "created_at", "id"),
+        Index("ix_requests_created_at_id", "created_at", "id"),
+        Index(
+            "ix_requests_pending_queue", desc("priority"), "created_at", "id",
+            postgresql_where=text("status = 'PENDING'"), sqlite_where=text("status = 'PENDING'")
+        ),
+    )
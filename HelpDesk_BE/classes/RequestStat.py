@@ -0,0 +1,12 @@
+from database import Base
+from sqlalchemy import Column, Integer, BigInteger, String, text
+
+
+class RequestStat(Base):
+    __tablename__ = "request_stats"
+
+    # A counter is split over a few slots so concurrent writers rarely lock the same row
+    dimension = Column(String, primary_key=True, nullable=False)
+    value = Column(String, primary_key=True, nullable=False)
+    slot = Column(Integer, primary_key=True, nullable=False, server_default=text('0'))
+    count = Column(BigInteger, nullable=False, server_default=text('0'))
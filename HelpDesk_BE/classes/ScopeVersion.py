@@ -0,0 +1,11 @@
+from database import Base
+from sqlalchemy import Column, Integer, BigInteger, String, text
+
+
+class ScopeVersion(Base):
+    __tablename__ = "scope_versions"
+
+    # Change counter per cached scope, split over slots like request_stats
+    scope = Column(String, primary_key=True, nullable=False)
+    slot = Column(Integer, primary_key=True, nullable=False, server_default=text('0'))
+    version = Column(BigInteger, nullable=False, server_default=text('0'))
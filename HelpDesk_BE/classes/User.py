@@ -1,5 +1,5 @@
-from database import Base
-from sqlalchemy import Column, Integer, String
+from database import Base, SQLiteTimestamp
+from sqlalchemy import Column, Integer, String, TIMESTAMP, Index
 from sqlalchemy import Enum as SQLEnum
 from Enums import UserTypes
 
@@ -11,6 +11,13 @@ class User(Base):
     email = Column(String, nullable=False, unique=True)
     password = Column(String, nullable=False)
     userType = Column(SQLEnum(UserTypes), nullable=False)
+    # Tokens issued before this are rejected, see auth.revoke_user
+    tokens_revoked_at = Column(TIMESTAMP(timezone=True).with_variant(SQLiteTimestamp, 'sqlite'), nullable=True)
+
+    # Client directory sorted by name, see migrations/versions
+    __table_args__ = (
+        Index("ix_users_name_id", "name", "id"),
+    )
 
     __mapper_args__ = {
         "polymorphic_identity": "user",
@@ -1,6 +1,11 @@
-from sqlalchemy import create_engine
+import time
+from typing import Optional
+from sqlalchemy import create_engine, exc, make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
 import os
 
@@ -11,18 +16,147 @@ db_password = os.getenv('DB_PASSWORD')
 db_name = os.getenv('DB_NAME')
 db_hostname = os.getenv('DB_HOSTNAME')
 
-DB_URL = f"postgresql://{db_username}:{db_password}@{db_hostname}/{db_name}"
+# DB_URL overrides the PostgreSQL settings, e.g. sqlite:///./helpdesk.db for local runs
+DB_URL = os.getenv('DB_URL') or f"postgresql://{db_username}:{db_password}@{db_hostname}/{db_name}"
 
-engine = create_engine(DB_URL)
+def async_url(url: str) -> str:
+
+    # Same database through the asyncio driver of its dialect
+    url = make_url(url)
+    driver = "aiosqlite" if url.get_backend_name() == "sqlite" else "asyncpg"
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+ASYNC_DB_URL = async_url(DB_URL)
+
+# Connection pool of the API engine, per worker process: size the pools so that
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) stays below max_connections
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+# Seconds to wait for a free connection before failing the request
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+# Seconds after which a connection is replaced, -1 keeps connections forever
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+# Test connections on checkout so restarts and idle disconnects do not fail requests
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+# PostgreSQL statement_timeout for API queries in milliseconds, 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    # Queue pool that records how long checkouts wait for a connection
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def recreate(self):
+
+        # dispose() swaps in a fresh pool, keep the counters going
+        pool = super().recreate()
+        pool.checkouts = self.checkouts
+        pool.timeouts = self.timeouts
+        pool.wait_seconds_total = self.wait_seconds_total
+        pool.wait_seconds_max = self.wait_seconds_max
+        return pool
+
+
+def async_connect_args(url: str, connect_timeout: Optional[float] = None) -> dict:
+
+    args = {}
+    if make_url(url).get_backend_name() == 'postgresql':
+        if DB_STATEMENT_TIMEOUT_MS:
+            args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        if connect_timeout is not None:
+            args["timeout"] = connect_timeout
+    return args
+
+def create_api_engine(url: str, connect_timeout: Optional[float] = None):
+
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=async_connect_args(url, connect_timeout),
+    )
+
+# Sync engine for migrations and manage.py commands, without the statement timeout
+engine = create_engine(DB_URL, pool_pre_ping=DB_POOL_PRE_PING)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-session = SessionLocal()
+
+# Async engine used by the API routes
+async_engine = create_api_engine(ASYNC_DB_URL)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Optional read replica for the read-only routes, same pool settings, see replicas.py
+DB_REPLICA_URL = os.getenv('DB_REPLICA_URL')
+# Seconds to wait for a replica connection before reads fall back to the primary
+DB_REPLICA_CONNECT_TIMEOUT = float(os.getenv('DB_REPLICA_CONNECT_TIMEOUT', '2'))
+
+replica_engine = None
+ReplicaSessionLocal = None
+if DB_REPLICA_URL:
+    replica_engine = create_api_engine(async_url(DB_REPLICA_URL), connect_timeout=DB_REPLICA_CONNECT_TIMEOUT)
+    ReplicaSessionLocal = async_sessionmaker(replica_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
+# SQLite stores datetimes as text, store them in the same format as CURRENT_TIMESTAMP
+# so server defaults and bound parameters compare correctly
+SQLiteTimestamp = sqlite.DATETIME(
+    storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d",
+    regexp=r"(\d+)-(\d+)-(\d+) (\d+):(\d+):(\d+)",
+)
+
+def dialect_insert(dialect_name: str):
+
+    # insert() construct with ON CONFLICT support for the given dialect
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+def pool_stats(api_engine=None) -> dict:
+
+    pool = (api_engine or async_engine).pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checkouts": pool.checkouts,
+        "timeouts": pool.timeouts,
+        "wait_seconds_total": round(pool.wait_seconds_total, 6),
+        "wait_seconds_max": round(pool.wait_seconds_max, 6),
+    }
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
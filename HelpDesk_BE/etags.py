@@ -0,0 +1,83 @@
+import hashlib
+import os
+import random
+from typing import Iterable, Optional
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from classes.ScopeVersion import ScopeVersion
+from database import dialect_insert
+
+# Conditional GET for the list and detail endpoints. Every write bumps the change
+# counter of the scopes it affects in its own transaction; a request whose
+# If-None-Match still names the current version is answered with 304 before the
+# list query runs.
+
+# Each transaction bumps one random slot, the version of a scope is the sum of its slots
+VERSION_SLOTS = int(os.getenv("VERSION_SLOTS", "8"))
+
+# Every ticket, seen by support users
+REQUESTS_SCOPE = "requests"
+# The client list of support users
+CLIENTS_SCOPE = "clients"
+
+def client_scope(client_id: int) -> str:
+
+    # The tickets of one client
+    return f"client:{client_id}"
+
+def request_scopes(client_ids: Iterable[Optional[int]]) -> list:
+
+    # Scopes touched by a change to tickets owned by `client_ids`
+    return [REQUESTS_SCOPE] + [client_scope(client_id) for client_id in set(client_ids) if client_id is not None]
+
+async def bump_versions(db: AsyncSession, scopes: Iterable[str]):
+
+    # Upsert in scope order so concurrent writers lock rows in the same order
+    slot = random.randrange(VERSION_SLOTS)
+    rows = [{"scope": scope, "slot": slot, "version": 1} for scope in sorted(set(scopes))]
+    if not rows:
+        return
+
+    query = dialect_insert(db.bind.dialect.name)(ScopeVersion)
+    await db.execute(
+        query.on_conflict_do_update(
+            index_elements=[ScopeVersion.scope, ScopeVersion.slot],
+            set_={"version": ScopeVersion.version + 1}
+        ),
+        rows
+    )
+
+async def current_version(db: AsyncSession, *scopes: str) -> int:
+
+    # Versions only grow, their sum changes whenever one of the scopes does
+    version = await db.scalar(select(func.sum(ScopeVersion.version)).where(ScopeVersion.scope.in_(scopes)))
+    return int(version or 0)
+
+def make_etag(http_request: Request, scope: str, version: int) -> str:
+
+    # Different query parameters are different representations of the same version
+    query = "&".join(sorted(http_request.url.query.split("&")))
+    digest = hashlib.sha1(f"{scope}|{version}|{http_request.url.path}?{query}".encode()).hexdigest()[:16]
+    return f'W/"{version}-{digest}"'
+
+def etag_matches(http_request: Request, etag: str) -> bool:
+
+    header = http_request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # Weak comparison, the W/ prefix is optional on the way back
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
+async def conditional_get(db: AsyncSession, http_request: Request, response: Response, *scopes: str) -> Optional[Response]:
+
+    # Read the version before the data: a write in between makes the ETag stale, never the body
+    # Browsers keep the response but revalidate it on every use. Responses built from several
+    # scopes pass all of them
+    etag = make_etag(http_request, "+".join(scopes), await current_version(db, *scopes))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(http_request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import asyncpg
+from sqlalchemy import event, make_url, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database import ASYNC_DB_URL
+from queries import request_clients_query
+
+logger = logging.getLogger(__name__)
+
+# Ticket events pushed to support users (every event) and to the owning client.
+# Writers publish inside their transaction, subscribers only see committed changes.
+
+SUPPORT_CHANNEL = "support"
+NOTIFY_CHANNEL = "helpdesk_events"
+
+# Slow subscribers lose buffered events and get a resync event instead
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+RESYNC_EVENT = {"event": "resync"}
+
+# Events for the workers themselves, handled by them instead of going to subscribers
+USER_REVOKED_EVENT = "user.revoked"
+
+HEARTBEAT_SECONDS = 15
+
+def client_channel(client_id: int) -> str:
+
+    return f"client:{client_id}"
+
+def request_event(kind: str, request, client_id: Optional[int]) -> dict:
+
+    # Ticket summary without the body, PostgreSQL limits NOTIFY payloads to 8000 bytes.
+    # `request` is a Request or a RETURNING row mapping
+    get = request.get if isinstance(request, Mapping) else lambda field: getattr(request, field)
+    created_at = get("created_at")
+    return {
+        "event": kind,
+        "client_id": client_id,
+        "request": {
+            "id": get("id"),
+            "type": get("type").value,
+            "status": get("status").value,
+            "priority": get("priority").value,
+            "viewed": get("viewed"),
+            "created_at": created_at.isoformat() if created_at else None,
+        },
+    }
+
+async def event_stream(channel: str):
+
+    # Server-Sent Events for one subscriber, with comments as keep-alive
+    async with hub.subscribe(channel) as queue:
+        yield ": connected\n\n"
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {item['event']}\ndata: {json.dumps(item)}\n\n"
+
+
+class EventHub:
+    # In-process fan-out from published events to the subscribed SSE streams
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        # event name -> callback of the worker, e.g. auth drops revoked principals
+        self.handlers: Dict[str, Callable[[dict], None]] = {}
+
+    def deliver(self, item: dict):
+
+        handler = self.handlers.get(item.get("event"))
+        if handler is not None:
+            handler(item)
+            return
+
+        if item is RESYNC_EVENT:
+            channels = list(self.subscribers)
+        else:
+            channels = [SUPPORT_CHANNEL]
+            if item.get("client_id") is not None:
+                channels.append(client_channel(item["client_id"]))
+
+        for channel in channels:
+            for queue in self.subscribers.get(channel, ()):
+                try:
+                    queue.put_nowait(item)
+                except asyncio.QueueFull:
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(RESYNC_EVENT)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers[channel].add(queue)
+        try:
+            yield queue
+        finally:
+            self.subscribers[channel].discard(queue)
+            if not self.subscribers[channel]:
+                del self.subscribers[channel]
+
+
+class MemoryBackend:
+    # Single process backend: events are delivered to the hub after the commit
+
+    PENDING_KEY = "pending_events"
+
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+
+    async def publish(self, db: AsyncSession, events: List[dict]):
+
+        db.info.setdefault(self.PENDING_KEY, []).extend(events)
+
+    def _after_commit(self, session: Session):
+
+        for pending in session.info.pop(self.PENDING_KEY, []):
+            self.hub.deliver(pending)
+
+    def _after_rollback(self, session: Session):
+
+        session.info.pop(self.PENDING_KEY, None)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class PostgresBackend:
+    # NOTIFY inside the writing transaction, every worker LISTENs and feeds its hub
+
+    RECONNECT_SECONDS = 1
+
+    def __init__(self, hub: EventHub, dsn: str):
+        self.hub = hub
+        self.dsn = dsn
+        self._task = None
+
+    async def publish(self, db: AsyncSession, events: List[dict]):
+
+        await db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"channel": NOTIFY_CHANNEL, "payloads": [json.dumps(item) for item in events]}
+        )
+
+    def _on_notify(self, connection, pid, channel, payload):
+
+        self.hub.deliver(json.loads(payload))
+
+    async def _listen(self):
+
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                try:
+                    await connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                    # Subscribers may have missed events while we were reconnecting
+                    self.hub.deliver(RESYNC_EVENT)
+                    while not connection.is_closed():
+                        await asyncio.sleep(self.RECONNECT_SECONDS)
+                finally:
+                    await connection.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event listener connection failed, reconnecting")
+            await asyncio.sleep(self.RECONNECT_SECONDS)
+
+    async def start(self):
+
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def create_backend(hub: EventHub):
+
+    # EVENTS_BACKEND=memory|postgres, PostgreSQL databases default to LISTEN/NOTIFY
+    url = make_url(ASYNC_DB_URL)
+    default = "postgres" if url.get_backend_name() == "postgresql" else "memory"
+    if os.getenv("EVENTS_BACKEND", default) == "postgres":
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresBackend(hub, dsn)
+    return MemoryBackend(hub)
+
+
+hub = EventHub(queue_size=SUBSCRIBER_QUEUE_SIZE)
+backend = create_backend(hub)
+
+async def publish(db: AsyncSession, events: Iterable[dict]):
+
+    # Call before commit, nothing is delivered if the transaction rolls back
+    events = list(events)
+    if events:
+        await backend.publish(db, events)
+
+async def publish_request_events(db: AsyncSession, kind: str, requests: list) -> Dict[int, int]:
+
+    # Support side writes do not know the owning clients, look them up for routing.
+    # Returns request_id -> client_id for the other per-client bookkeeping
+    get_id = lambda request: request["id"] if isinstance(request, Mapping) else request.id
+    owners = dict((await db.execute(request_clients_query([get_id(request) for request in requests]))).all())
+    await publish(db, [request_event(kind, request, owners.get(get_id(request))) for request in requests])
+    return owners
@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, Optional
+from sqlalchemy import Select
+from classes.Request import Request
+from database import AsyncSessionLocal
+from viewed import viewed_buffer
+from queries import with_archived
+
+# Streaming ticket export: rows are read in batches through a server-side cursor
+# and written out as they arrive, memory does not grow with the result
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+EXPORT_COLUMNS = [column.name for column in Request.__table__.columns]
+
+def export_record(record: dict) -> dict:
+
+    for field in ("type", "status", "priority"):
+        record[field] = record[field].value
+    for field in ("created_at", "claimed_at"):
+        if record[field] is not None:
+            record[field] = record[field].isoformat()
+    return record
+
+def format_batch(records: list, export_format: str) -> str:
+
+    if export_format == "ndjson":
+        return "".join(json.dumps(record) + "\n" for record in records)
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writerows(records)
+    return buffer.getvalue()
+
+async def export_rows(query: Select, export_format: str, archived: bool = False,
+                      session_factory=AsyncSessionLocal, viewed: Optional[bool] = None) -> AsyncIterator[str]:
+
+    # The request's session is closed before a StreamingResponse body runs, open our own
+    # from `session_factory`, the replica's for the export route. `viewed` is the query's
+    # viewed filter, pending viewed marks are applied with it
+    if export_format == "csv":
+        yield ",".join(EXPORT_COLUMNS) + "\r\n"
+
+    # Plain columns instead of ORM objects, nothing piles up in the identity map
+    query = query.with_only_columns(*Request.__table__.columns).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    if archived:
+        query = with_archived(query)
+    async with session_factory() as db:
+        result = await db.stream(query)
+        async for partition in result.mappings().partitions():
+            records = viewed_buffer.overlay([dict(row) for row in partition], viewed)
+            yield format_batch([export_record(record) for record in records], export_format)
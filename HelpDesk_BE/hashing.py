@@ -0,0 +1,120 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+
+# Kept free of app imports: the pool workers import this module on spawn
+
+load_dotenv()
+
+# bcrypt cost, hashes with a different cost are rehashed on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Worker processes for hashing, and how many more jobs may wait before we shed load
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", str(os.cpu_count() or 1)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(HASH_POOL_SIZE * 8)))
+
+# Password hashing
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_desired_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_desired_rounds=BCRYPT_ROUNDS,
+)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+
+    return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+
+    # Second item is a new hash when the stored one uses an outdated cost
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def get_password_hash(password: str) -> str:
+
+    return pwd_context.hash(password)
+
+
+class HashPoolFull(Exception):
+    pass
+
+
+class HashPool:
+    # Runs bcrypt in worker processes so it holds neither the GIL nor the event loop
+
+    def __init__(self, size: int, queue_limit: int):
+        self.size = size
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.size,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def run(self, func, *args):
+
+        # Jobs beyond the running ones plus the queue limit are rejected right away
+        if self.pending >= self.size + self.queue_limit:
+            raise HashPoolFull()
+
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return await self._submit(executor, func, *args)
+            except BrokenProcessPool:
+                # A worker died (OOM killer...) and the executor is unusable for good: replace it
+                # and retry once, hashing jobs have no side effects
+                self._discard(executor)
+                if attempt:
+                    raise
+
+    async def _submit(self, executor: ProcessPoolExecutor, func, *args):
+
+        # Counted until the job itself is done: a cancelled awaiter leaves the job queued
+        # or running in the pool, and cancelling it only succeeds while it is still queued
+        loop = asyncio.get_running_loop()
+        job = executor.submit(func, *args)
+        self.pending += 1
+        job.add_done_callback(lambda _: self._job_done(loop))
+        return await asyncio.wrap_future(job)
+
+    def _discard(self, executor: ProcessPoolExecutor):
+
+        # Concurrent jobs of the same broken executor must not shut down its replacement
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _job_done(self, loop: asyncio.AbstractEventLoop):
+
+        # Called from the pool's thread, the counter belongs to the event loop
+        try:
+            loop.call_soon_threadsafe(self._decrement)
+        except RuntimeError:
+            # Loop already closed on shutdown
+            pass
+
+    def _decrement(self):
+
+        self.pending -= 1
+
+    def shutdown(self):
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hash_pool = HashPool(size=HASH_POOL_SIZE, queue_limit=HASH_QUEUE_LIMIT)
@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import HTTPException, Response, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from classes.IdempotencyKey import IdempotencyKey
+from database import AsyncSessionLocal, dialect_insert
+
+logger = logging.getLogger(__name__)
+
+# Idempotency-Key support for ticket creation. The key row is inserted first, in the
+# transaction that creates the tickets, and gets the response before the commit: a retry
+# finds the committed response and gets it back without another insert. A concurrent
+# request with the same key waits on the primary key of the uncommitted row, then replays
+# the response, or runs itself when the first one rolled back. Keys are per client and
+# expire after IDEMPOTENCY_TTL_SECONDS, a background job deletes the expired ones.
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_PURGE_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "3600"))
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+def request_fingerprint(operation: str, payload: BaseModel) -> str:
+
+    # A key reused for a different body is an error, not a replay
+    return hashlib.sha256(f"{operation}|{payload.model_dump_json()}".encode()).hexdigest()
+
+def expiry_cutoff() -> datetime:
+
+    return datetime.now(timezone.utc) - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+
+async def claim_key(db: AsyncSession, client_id: int, key: str, fingerprint: str) -> Optional[Response]:
+
+    # None when this request owns the key and creates the tickets, the stored response otherwise.
+    # An expired row is taken over as if it did not exist
+    query = dialect_insert(db.bind.dialect.name)(IdempotencyKey).values(
+        client_id=client_id, key=key, fingerprint=fingerprint
+    )
+    claimed = await db.scalar(
+        query.on_conflict_do_update(
+            index_elements=[IdempotencyKey.client_id, IdempotencyKey.key],
+            set_={"fingerprint": fingerprint, "response": None, "created_at": func.now()},
+            where=IdempotencyKey.created_at < expiry_cutoff()
+        ).returning(IdempotencyKey.key)
+    )
+    if claimed is not None:
+        return None
+
+    stored = (await db.execute(
+        select(IdempotencyKey.fingerprint, IdempotencyKey.response).where(
+            IdempotencyKey.client_id == client_id, IdempotencyKey.key == key
+        )
+    )).first()
+    if stored is None or stored.response is None:
+        # Only when the database does not make us wait for the first request (SQLite)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still in progress"
+        )
+    if stored.fingerprint != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different request"
+        )
+    return Response(stored.response, media_type="application/json", headers={REPLAYED_HEADER: "true"})
+
+async def save_response(db: AsyncSession, client_id: int, key: str, content):
+
+    # Call before commit, the response is kept only with the tickets it describes
+    await db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.client_id == client_id, IdempotencyKey.key == key)
+        .values(response=json.dumps(jsonable_encoder(content)))
+    )
+
+async def purge_expired_keys() -> int:
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < expiry_cutoff()))
+        await db.commit()
+    return result.rowcount
+
+
+class IdempotencyPurgeJob:
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task = None
+
+    async def _run(self):
+
+        while True:
+            try:
+                purged = await purge_expired_keys()
+                if purged:
+                    logger.info("Purged %d expired idempotency keys", purged)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Purging idempotency keys failed, retrying on the next interval")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+idempotency_purge_job = IdempotencyPurgeJob(interval=IDEMPOTENCY_PURGE_SECONDS)
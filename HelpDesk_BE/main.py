@@ -1,14 +1,47 @@
-from database import Base, engine
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from routes.supportUserRoute import router as user_router
 from routes.clientRoute import router as client_router
 from routes.authRoute import router as auth_router
-from database import session
+from database import async_engine, replica_engine, pool_stats
+from migrate import run_migrations
+from hashing import hash_pool
+from events import backend as events_backend
+from viewed import viewed_buffer
+from archive import archive_job
+from idempotency import idempotency_purge_job
+from replicas import replica_router
+from metrics import MetricsMiddleware, install_query_hooks, render_metrics
 
-Base.metadata.create_all(bind=engine)
+run_migrations()
 
-app = FastAPI(title="HelpDesk API", description="HelpDesk System with JWT Authorization")
+# Count queries and DB time of every API request
+install_query_hooks(async_engine.sync_engine)
+if replica_engine is not None:
+    install_query_hooks(replica_engine.sync_engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await events_backend.start()
+    await replica_router.start()
+    await viewed_buffer.start()
+    await archive_job.start()
+    await idempotency_purge_job.start()
+    yield
+    await idempotency_purge_job.stop()
+    await archive_job.stop()
+    # Write the last viewed marks while the database and events are still up
+    await viewed_buffer.stop()
+    await events_backend.stop()
+    await replica_router.stop()
+    hash_pool.shutdown()
+    await async_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+app = FastAPI(title="HelpDesk API", description="HelpDesk System with JWT Authorization", lifespan=lifespan)
 
 # Add CORS middleware to allow requests from React app
 app.add_middleware(
@@ -17,8 +50,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count-Estimate", "Server-Timing", "ETag", "Idempotent-Replayed", "X-Last-Write"],
 )
 
+# Latency histograms per route and Server-Timing headers
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(auth_router)
 app.include_router(user_router)
-app.include_router(client_router)
\ No newline at end of file
+app.include_router(client_router)
+
+@app.get("/health/db-pool", tags=["Health"])
+async def db_pool_health():
+    # Live connection pool usage of this worker
+    stats = pool_stats()
+    if replica_engine is not None:
+        stats["replica"] = {**replica_router.status(), "pool": pool_stats(replica_engine)}
+    return stats
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+from sqlalchemy import select
+from archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, archive_requests
+from auth import revoke_user
+from classes.User import User
+from database import AsyncSessionLocal, SessionLocal, async_engine
+from Enums import RequestStatus, RequestPriorityTypes
+from migrate import run_migrations
+from pagination import sort_key, apply_order
+from queries import support_requests_query, client_requests_query, client_request_query, client_directory_query, queue_query, with_archived
+from stats import reconcile_stats
+
+
+def list_endpoint_queries(client_id: int, request_id: int, limit: int):
+
+    # (label, query) for every list endpoint, built with the same helpers as the routes
+    newest_first = sort_key("created_at", "desc")
+    by_priority = sort_key("priority", "desc")
+
+    yield "GET /support/requests/", apply_order(support_requests_query(), newest_first).limit(limit)
+    yield "GET /support/requests/?status=0&priority=2", apply_order(support_requests_query(
+        status_enum=RequestStatus.PENDING, priority_enum=RequestPriorityTypes.IMPORTANT
+    ), newest_first).limit(limit)
+    yield "GET /support/requests/?status=0&sort_by=priority", apply_order(support_requests_query(
+        status_enum=RequestStatus.PENDING
+    ), by_priority).limit(limit)
+    yield "GET /support/requests/?viewed=false", apply_order(support_requests_query(viewed=False), newest_first).limit(limit)
+    yield "GET /support/requests/?q=login+error", apply_order(
+        support_requests_query(search="login error"), sort_key(None, "desc", "login error"), "login error"
+    ).limit(limit)
+    yield "GET /support/requests/?include_archived=true", with_archived(
+        apply_order(support_requests_query(), newest_first).limit(limit)
+    )
+    yield "GET /support/clients/?limit=N", client_directory_query("id", False, limit=limit)
+    yield "GET /support/clients/?sort_by=name&limit=N", client_directory_query("name", False, limit=limit)
+    yield "POST /support/queue/next", queue_query().limit(1)
+
+    yield "GET /client/my-requests/", apply_order(client_requests_query(client_id), newest_first).limit(limit)
+    yield "GET /client/request/{id}", client_request_query(client_id, request_id)
+
+def is_sequential_scan(line: str) -> bool:
+
+    # PostgreSQL prints "Seq Scan on t", SQLite prints "SCAN t" without "USING INDEX"
+    line = line.strip()
+    return "Seq Scan" in line or (line.startswith("SCAN") and "USING" not in line)
+
+def explain(args):
+
+    db = SessionLocal()
+    try:
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            prefix = "EXPLAIN (ANALYZE, BUFFERS)" if args.analyze else "EXPLAIN"
+        else:
+            prefix = "EXPLAIN QUERY PLAN"
+
+        for label, query in list_endpoint_queries(args.client_id, args.request_id, args.limit):
+            sql = query.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+            lines = [str(row[-1]) for row in db.connection().exec_driver_sql(f"{prefix} {sql}")]
+
+            print(f"== {label}")
+            for line in lines:
+                print(f"    {line}")
+            if any(is_sequential_scan(line) for line in lines):
+                print("    -> sequential scan, no index used")
+            print()
+    finally:
+        db.close()
+
+def migrate(args):
+
+    run_migrations(args.revision)
+
+def reconcile(args):
+
+    db = SessionLocal()
+    try:
+        drift = reconcile_stats(db, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    for (dimension, value), (stored, actual) in drift.items():
+        print(f"{dimension}={value}: stored {stored}, actual {actual} ({actual - stored:+d})")
+    if not drift:
+        print("Stats match the requests table")
+    elif args.dry_run:
+        print(f"{len(drift)} counters drifted, run without --dry-run to rebuild them")
+    else:
+        print(f"{len(drift)} counters drifted, rebuilt from the requests table")
+
+def archive(args):
+
+    async def run():
+        try:
+            return await archive_requests(args.days, args.batch_size)
+        finally:
+            await async_engine.dispose()
+
+    if args.days <= 0:
+        raise SystemExit("--days must be positive")
+    print(f"Archived {asyncio.run(run())} DONE requests older than {args.days} days")
+
+def revoke(args):
+
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                user_id = await db.scalar(select(User.id).where(User.email == args.email))
+                if user_id is None:
+                    raise SystemExit(f"No user with the email {args.email}")
+                await revoke_user(db, user_id)
+                await db.commit()
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(run())
+    print(f"Revoked every token issued so far to {args.email}")
+
+def main():
+
+    parser = argparse.ArgumentParser(description="HelpDesk management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Apply schema migrations")
+    migrate_parser.add_argument("revision", nargs="?", default="head")
+    migrate_parser.set_defaults(func=migrate)
+
+    explain_parser = subparsers.add_parser("explain", help="Print the query plan of every list endpoint")
+    explain_parser.add_argument("--client-id", type=int, default=1, help="Client whose requests are listed")
+    explain_parser.add_argument("--request-id", type=int, default=1, help="Request used for the single request lookup")
+    explain_parser.add_argument("--limit", type=int, default=50, help="Page size used for the list queries")
+    explain_parser.add_argument("--analyze", action="store_true", help="Run EXPLAIN ANALYZE (PostgreSQL only)")
+    explain_parser.set_defaults(func=explain)
+
+    reconcile_parser = subparsers.add_parser("reconcile-stats", help="Rebuild the request stats counters and report drift")
+    reconcile_parser.add_argument("--dry-run", action="store_true", help="Only report drift, leave the counters as they are")
+    reconcile_parser.set_defaults(func=reconcile)
+
+    archive_parser = subparsers.add_parser("archive", help="Move old DONE requests to the archive tables")
+    archive_parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="Archive DONE requests created more than this many days ago")
+    archive_parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="Requests moved per transaction")
+    archive_parser.set_defaults(func=archive)
+
+    revoke_parser = subparsers.add_parser("revoke-user", help="Reject every token issued so far to a user")
+    revoke_parser.add_argument("email", help="Email of the user")
+    revoke_parser.set_defaults(func=revoke)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
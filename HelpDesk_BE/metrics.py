@@ -0,0 +1,235 @@
+import re
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from database import pool_stats
+
+# Request latency and database accounting, rendered in the Prometheus text format
+# on /metrics and summarised per response in a Server-Timing header
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Per-query Server-Timing entries are capped, the totals always cover every query
+SERVER_TIMING_MAX_QUERIES = 20
+
+# Label for requests that matched no route, keeps unknown paths out of the label set
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> (per bucket counts, sum, count)
+        self.series: Dict[Tuple, list] = {}
+
+    def observe(self, labels: Tuple, value: float):
+
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (bucket_counts, total, count) in sorted(self.series.items()):
+            base = format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{format_labels(self.label_names, labels, le=bound)} {cumulative}")
+            lines.append(f"{self.name}_bucket{format_labels(self.label_names, labels, le='+Inf')} {count}")
+            lines.append(f"{self.name}_sum{base} {total}")
+            lines.append(f"{self.name}_count{base} {count}")
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.series: Dict[Tuple, float] = defaultdict(float)
+
+    def inc(self, labels: Tuple, value: float = 1):
+
+        self.series[labels] += value
+
+    def render(self) -> List[str]:
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.series.items()):
+            lines.append(f"{self.name}{format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+def format_labels(names: Sequence[str], values: Tuple, **extra) -> str:
+
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+request_duration = Histogram(
+    "helpdesk_http_request_duration_seconds", "HTTP request latency by route template and status code.",
+    ("method", "route", "status"), LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "helpdesk_http_request_db_queries", "Database queries issued per HTTP request.",
+    ("method", "route"), QUERY_COUNT_BUCKETS
+)
+db_queries = Counter(
+    "helpdesk_db_queries_total", "Database queries by route template.", ("route",)
+)
+db_seconds = Counter(
+    "helpdesk_db_query_seconds_total", "Time spent in database queries by route template.", ("route",)
+)
+
+
+# Database accounting of the current request, picked up by the engine hooks
+
+class QueryLog:
+
+    def __init__(self):
+        self.queries: List[Tuple[str, float]] = []
+
+    @property
+    def total_seconds(self) -> float:
+
+        return sum(duration for _, duration in self.queries)
+
+current_queries: ContextVar[Optional[QueryLog]] = ContextVar("current_queries", default=None)
+
+TABLE_NAME = re.compile(r'\b(?:FROM|INTO|UPDATE|JOIN)\s+"?(\w+)', re.I)
+VERB_AFTER_CTE = re.compile(r"\)\s*(SELECT|INSERT|UPDATE|DELETE)\b", re.I)
+CTE_NAME = re.compile(r'(?:\bWITH|,)\s+"?(\w+)"?\s+AS\b', re.I)
+
+def describe_statement(statement: str) -> str:
+
+    # "SELECT users", "SELECT requests, client_requests", enough to tell queries apart
+    words = statement.split(None, 1)
+    if not words:
+        return "?"
+    verb = words[0].upper()
+    if verb == "WITH":
+        verbs = VERB_AFTER_CTE.findall(statement)
+        verb = verbs[-1].upper() if verbs else verb
+    # Skip CTE names and ON CONFLICT ... DO UPDATE SET
+    skipped = {name.lower() for name in CTE_NAME.findall(statement)} | {"set"}
+    tables = [table for table in dict.fromkeys(TABLE_NAME.findall(statement)) if table.lower() not in skipped]
+    return f"{verb} {', '.join(tables)}" if tables else verb
+
+def install_query_hooks(engine: Engine):
+
+    # Pass async_engine.sync_engine, the hooks run inside the awaiting request's context
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        log = current_queries.get()
+        if log is not None:
+            log.queries.append((statement, elapsed))
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+def server_timing(log: QueryLog, app_seconds: float) -> str:
+
+    entries = [
+        f'db;dur={log.total_seconds * 1000:.2f};desc="{len(log.queries)} queries"',
+        f"app;dur={app_seconds * 1000:.2f}",
+    ]
+    for index, (statement, duration) in enumerate(log.queries[:SERVER_TIMING_MAX_QUERIES], start=1):
+        entries.append(f'q{index};dur={duration * 1000:.2f};desc="{describe_statement(statement)}"')
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware, streamed responses (SSE, exports) pass through untouched
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+        token = current_queries.set(log)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(log, time.perf_counter() - start).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_queries.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+
+            request_duration.observe((method, route_path, str(status_code)), time.perf_counter() - start)
+            request_queries.observe((method, route_path), len(log.queries))
+            db_queries.inc((route_path,), len(log.queries))
+            db_seconds.inc((route_path,), log.total_seconds)
+
+
+def render_pool_metrics() -> List[str]:
+
+    stats = pool_stats()
+    gauges = [
+        ("helpdesk_db_pool_size", "Connections kept in the pool.", stats["size"]),
+        ("helpdesk_db_pool_checked_out", "Connections currently checked out.", stats["checked_out"]),
+        ("helpdesk_db_pool_overflow", "Connections open beyond the pool size.", stats["overflow"]),
+    ]
+    counters = [
+        ("helpdesk_db_pool_checkouts_total", "Connection checkouts.", stats["checkouts"]),
+        ("helpdesk_db_pool_timeouts_total", "Checkouts that timed out waiting for a connection.", stats["timeouts"]),
+        ("helpdesk_db_pool_wait_seconds_total", "Time spent waiting for connections.", stats["wait_seconds_total"]),
+    ]
+    lines = []
+    for kind, metrics in (("gauge", gauges), ("counter", counters)):
+        for name, documentation, value in metrics:
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {value}"]
+    return lines
+
+def render_metrics() -> str:
+
+    lines = []
+    for metric in (request_duration, request_queries, db_queries, db_seconds):
+        lines += metric.render()
+    lines += render_pool_metrics()
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,37 @@
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+from database import engine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Revision matching the schema that Base.metadata.create_all used to build
+BASELINE_REVISION = "0001"
+
+# Arbitrary key for pg_advisory_xact_lock so concurrent workers migrate one at a time
+MIGRATION_LOCK_KEY = 7240531
+
+def alembic_config() -> Config:
+
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    return config
+
+def run_migrations(revision: str = "head"):
+
+    config = alembic_config()
+    config.attributes["configure_logger"] = False
+
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+        config.attributes["connection"] = connection
+
+        # Adopt databases created by create_all before migrations existed
+        tables = inspect(connection).get_table_names()
+        if "alembic_version" not in tables and "requests" in tables:
+            command.stamp(config, BASELINE_REVISION)
+
+        command.upgrade(config, revision)
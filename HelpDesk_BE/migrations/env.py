@@ -0,0 +1,51 @@
+from logging.config import fileConfig
+from alembic import context
+from database import Base, engine
+# Import every model so Base.metadata is complete for autogenerate
+from classes.User import User
+from classes.Client import Client
+from classes.SupportUser import SupportUser
+from classes.Request import Request
+from classes.ClientRequest import ClientRequest
+from classes.ArchivedRequest import ArchivedRequest
+from classes.ArchivedClientRequest import ArchivedClientRequest
+from classes.RequestStat import RequestStat
+from classes.ScopeVersion import ScopeVersion
+from classes.IdempotencyKey import IdempotencyKey
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def run_migrations_offline():
+
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+
+    # migrate.py passes in a connection that already holds the migration lock
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
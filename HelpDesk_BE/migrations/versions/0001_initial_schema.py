@@ -0,0 +1,66 @@
+"""initial schema
+
+The tables as they were created by Base.metadata.create_all before migrations
+existed. Databases created that way are stamped with this revision by migrate.py.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-07-14 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from Enums import UserTypes, RequestTypes, RequestStatus, RequestPriorityTypes
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False, autoincrement=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False, unique=True),
+        sa.Column('password', sa.String(), nullable=False),
+        sa.Column('userType', sa.Enum(UserTypes), nullable=False),
+    )
+    op.create_table(
+        'clients',
+        sa.Column('id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True, nullable=False),
+    )
+    op.create_table(
+        'support_users',
+        sa.Column('id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True, nullable=False),
+    )
+    op.create_table(
+        'requests',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False, autoincrement=True),
+        sa.Column('type', sa.Enum(RequestTypes), nullable=False),
+        sa.Column('request', sa.String(), nullable=False),
+        sa.Column('status', sa.Enum(RequestStatus), nullable=False, server_default=sa.text(f"'{RequestStatus.PENDING.name}'")),
+        sa.Column('priority', sa.Enum(RequestPriorityTypes), nullable=False),
+        sa.Column('viewed', sa.Boolean(), nullable=False, server_default=sa.text('false')),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        'client_requests',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False, autoincrement=True),
+        sa.Column('client_id', sa.Integer(), sa.ForeignKey('clients.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('request_id', sa.Integer(), sa.ForeignKey('requests.id', ondelete='CASCADE'), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('client_requests')
+    op.drop_table('requests')
+    op.drop_table('support_users')
+    op.drop_table('clients')
+    op.drop_table('users')
+    sa.Enum(RequestPriorityTypes).drop(op.get_bind(), checkfirst=True)
+    sa.Enum(RequestStatus).drop(op.get_bind(), checkfirst=True)
+    sa.Enum(RequestTypes).drop(op.get_bind(), checkfirst=True)
+    sa.Enum(UserTypes).drop(op.get_bind(), checkfirst=True)
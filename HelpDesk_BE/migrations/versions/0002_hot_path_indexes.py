@@ -0,0 +1,33 @@
+"""composite indexes for the list filters and ownership checks
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-07-14 10:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Support list filtered by status/priority, sorted by created_at with the id tie-breaker
+    op.create_index('ix_requests_status_priority_created_at', 'requests', ['status', 'priority', 'created_at', 'id'])
+    # "New requests" view, filtered by viewed and sorted by created_at
+    op.create_index('ix_requests_viewed_created_at', 'requests', ['viewed', 'created_at', 'id'])
+    # Default unfiltered listing, created_at with the keyset tie-breaker
+    op.create_index('ix_requests_created_at_id', 'requests', ['created_at', 'id'])
+    # Client history and ownership checks
+    op.create_index('ix_client_requests_client_id_request_id', 'client_requests', ['client_id', 'request_id'])
+
+
+def downgrade():
+    op.drop_index('ix_client_requests_client_id_request_id', table_name='client_requests')
+    op.drop_index('ix_requests_created_at_id', table_name='requests')
+    op.drop_index('ix_requests_viewed_created_at', table_name='requests')
+    op.drop_index('ix_requests_status_priority_created_at', table_name='requests')
@@ -0,0 +1,26 @@
+"""index client_requests by request_id
+
+Finding the owning client of a request (event routing, cascading deletes from
+requests) cannot use the (client_id, request_id) index.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-07-21 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_client_requests_request_id', 'client_requests', ['request_id'])
+
+
+def downgrade():
+    op.drop_index('ix_client_requests_request_id', table_name='client_requests')
@@ -0,0 +1,41 @@
+"""request_stats counters
+
+Ticket counts per status, priority, type and viewed flag for /support/stats,
+seeded from the existing requests.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-07-24 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'request_stats',
+        sa.Column('dimension', sa.String(), nullable=False),
+        sa.Column('value', sa.String(), nullable=False),
+        sa.Column('slot', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('count', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.PrimaryKeyConstraint('dimension', 'value', 'slot'),
+    )
+    op.execute(
+        "INSERT INTO request_stats (dimension, value, slot, count) "
+        "SELECT 'total', 'all', 0, count(*) FROM requests "
+        "UNION ALL SELECT 'type', CAST(type AS VARCHAR), 0, count(*) FROM requests GROUP BY type "
+        "UNION ALL SELECT 'status', CAST(status AS VARCHAR), 0, count(*) FROM requests GROUP BY status "
+        "UNION ALL SELECT 'priority', CAST(priority AS VARCHAR), 0, count(*) FROM requests GROUP BY priority "
+        "UNION ALL SELECT 'viewed', CASE WHEN viewed THEN 'true' ELSE 'false' END, 0, count(*) FROM requests GROUP BY viewed"
+    )
+
+
+def downgrade():
+    op.drop_table('request_stats')
@@ -0,0 +1,51 @@
+"""full-text search over request bodies
+
+PostgreSQL only: a stored tsvector column with a GIN index, plus a trigram
+index when the pg_trgm extension can be installed. Adding the column
+rewrites the requests table. SQLite searches with LIKE instead.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-07-28 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute(
+        "ALTER TABLE requests ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', request)) STORED"
+    )
+    op.create_index('ix_requests_search_vector', 'requests', ['search_vector'], postgresql_using='gin')
+
+    # Substring and typo matching, skipped when the extension is missing or we may not create it
+    try:
+        with bind.begin_nested():
+            bind.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except sa.exc.DBAPIError:
+        return
+    op.create_index(
+        'ix_requests_request_trgm', 'requests', ['request'],
+        postgresql_using='gin', postgresql_ops={'request': 'gin_trgm_ops'}
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_requests_request_trgm")
+    op.drop_index('ix_requests_search_vector', table_name='requests')
+    op.drop_column('requests', 'search_vector')
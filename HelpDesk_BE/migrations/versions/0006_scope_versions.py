@@ -0,0 +1,31 @@
+"""scope_versions change counters
+
+Version tokens behind the ETags of the request and client lists.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-08-04 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'scope_versions',
+        sa.Column('scope', sa.String(), nullable=False),
+        sa.Column('slot', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('version', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.PrimaryKeyConstraint('scope', 'slot'),
+    )
+
+
+def downgrade():
+    op.drop_table('scope_versions')
@@ -0,0 +1,41 @@
+"""support queue claims
+
+Who took a ticket from the queue and when, plus a partial index over the
+pending tickets in queue order (highest priority, then oldest).
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-08-11 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('requests') as batch_op:
+        batch_op.add_column(sa.Column('claimed_by', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('claimed_at', sa.TIMESTAMP(timezone=True), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_requests_claimed_by_support_users', 'support_users', ['claimed_by'], ['id'], ondelete='SET NULL'
+        )
+
+    pending = sa.text("status = 'PENDING'")
+    op.create_index(
+        'ix_requests_pending_queue', 'requests', [sa.text('priority DESC'), 'created_at', 'id'],
+        postgresql_where=pending, sqlite_where=pending
+    )
+
+
+def downgrade():
+    op.drop_index('ix_requests_pending_queue', table_name='requests')
+    with op.batch_alter_table('requests') as batch_op:
+        batch_op.drop_constraint('fk_requests_claimed_by_support_users', type_='foreignkey')
+        batch_op.drop_column('claimed_at')
+        batch_op.drop_column('claimed_by')
@@ -0,0 +1,66 @@
+"""archive tables for old DONE requests
+
+archive.py moves DONE requests past ARCHIVE_AFTER_DAYS out of requests and
+client_requests into these tables, ids kept, so the live tables and their
+indexes only hold the working set. On PostgreSQL the archive gets the same
+search_vector column as requests, searches over both tables keep working.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-08-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from Enums import RequestTypes, RequestStatus, RequestPriorityTypes
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def enum_type(enum_class):
+
+    # The PostgreSQL enum types exist since 0001
+    return sa.Enum(enum_class).with_variant(postgresql.ENUM(enum_class, create_type=False), 'postgresql')
+
+
+def upgrade():
+    op.create_table(
+        'archived_requests',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False, autoincrement=False),
+        sa.Column('type', enum_type(RequestTypes), nullable=False),
+        sa.Column('request', sa.String(), nullable=False),
+        sa.Column('status', enum_type(RequestStatus), nullable=False),
+        sa.Column('priority', enum_type(RequestPriorityTypes), nullable=False),
+        sa.Column('viewed', sa.Boolean(), nullable=False, server_default=sa.text('false')),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True)),
+        sa.Column('claimed_by', sa.Integer(), sa.ForeignKey('support_users.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('claimed_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        'archived_client_requests',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False, autoincrement=False),
+        sa.Column('client_id', sa.Integer(), sa.ForeignKey('clients.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('request_id', sa.Integer(), sa.ForeignKey('archived_requests.id', ondelete='CASCADE'), nullable=False),
+    )
+    # Newest first listings and client history that include the archive
+    op.create_index('ix_archived_requests_created_at_id', 'archived_requests', ['created_at', 'id'])
+    op.create_index('ix_archived_client_requests_client_id_request_id', 'archived_client_requests', ['client_id', 'request_id'])
+    op.create_index('ix_archived_client_requests_request_id', 'archived_client_requests', ['request_id'])
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "ALTER TABLE archived_requests ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('english', request)) STORED"
+        )
+        op.create_index('ix_archived_requests_search_vector', 'archived_requests', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_table('archived_client_requests')
+    op.drop_table('archived_requests')
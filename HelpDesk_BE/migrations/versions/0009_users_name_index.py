@@ -0,0 +1,24 @@
+"""name ordering of the client directory
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-08-25 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GET /support/clients/?sort_by=name, keyset pages on (name, id)
+    op.create_index('ix_users_name_id', 'users', ['name', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_users_name_id', table_name='users')
@@ -0,0 +1,28 @@
+"""users.tokens_revoked_at
+
+Tokens issued before this time are rejected, checked by every worker when
+it resolves a token it has not cached yet.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2025-09-08 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('tokens_revoked_at', sa.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('tokens_revoked_at')
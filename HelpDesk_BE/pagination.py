@@ -0,0 +1,171 @@
+import base64
+import binascii
+import json
+import re
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import Select, asc, desc, func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from classes.Request import Request
+from Enums import RequestPriorityTypes
+from search import search_rank
+from queries import CLIENT_SORT_COLUMNS, client_directory_query, priority_rank, with_archived
+
+# Lists are always paged, callers wanting more follow the cursor, up to MAX_PAGE_SIZE rows at a time
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Response headers carrying pagination metadata, the body stays a plain list
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_ESTIMATE_HEADER = "X-Total-Count-Estimate"
+
+invalid_cursor_exception = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid cursor"
+)
+
+def sort_key(sort_by: Optional[str], sort_order: Optional[str], search: Optional[str] = None) -> str:
+
+    # Searches are ordered by relevance unless another order is asked for
+    if sort_by is None and search:
+        sort_by = "relevance"
+
+    if sort_by == "relevance" and search:
+        column = "relevance"
+    else:
+        column = "priority" if sort_by == "priority" else "created_at"
+    direction = "asc" if sort_order == "asc" else "desc"
+    return f"{column}:{direction}"
+
+def client_sort_key(sort_by: Optional[str], sort_order: Optional[str]) -> str:
+
+    # Client directory ordering, registration order unless name or email is asked for
+    column = sort_by if sort_by in CLIENT_SORT_COLUMNS else "id"
+    direction = "desc" if sort_order == "desc" else "asc"
+    return f"{column}:{direction}"
+
+def order_columns(key: str, search: Optional[str] = None):
+
+    # Request.id is the tie-breaker so the ordering is total and the cursor unambiguous
+    column, direction = key.split(":")
+    if column == "relevance":
+        sort_column = search_rank(search)
+    else:
+        sort_column = priority_rank(Request.priority) if column == "priority" else Request.created_at
+    return [sort_column, Request.id], direction
+
+def apply_order(query: Select, key: str, search: Optional[str] = None) -> Select:
+
+    columns, direction = order_columns(key, search)
+    order = asc if direction == "asc" else desc
+    return query.order_by(*[order(column) for column in columns])
+
+def _dump_value(value):
+
+    if isinstance(value, RequestPriorityTypes):
+        return value.name
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _load_value(column: str, value):
+
+    if column in ("name", "email"):
+        return str(value)
+    if column == "id":
+        return int(value)
+    if column == "priority":
+        return RequestPriorityTypes[value]
+    if column == "relevance":
+        return float(value)
+    return datetime.fromisoformat(value)
+
+def encode_cursor(key: str, value, row_id: int) -> str:
+
+    payload = {"k": key, "v": [_dump_value(value), row_id]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(key: str, cursor: str) -> Tuple:
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        # A cursor is only valid for the ordering it was issued for
+        if payload["k"] != key:
+            raise invalid_cursor_exception
+        value, last_id = payload["v"]
+        return _load_value(key.split(":")[0], value), int(last_id)
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise invalid_cursor_exception
+
+async def paginate(db: AsyncSession, query: Select, key: str, limit: Optional[int], cursor: Optional[str],
+                   search: Optional[str] = None, select_columns: Optional[list] = None,
+                   archived: bool = False) -> Tuple[list, Optional[str]]:
+
+    # With `select_columns` the page holds plain dicts of those columns instead of Request objects,
+    # with `archived` archived requests are listed too
+    columns, direction = order_columns(key, search)
+
+    if cursor is not None:
+        # Cursor values go through the same expressions as the columns they are compared with
+        last_values = tuple_(*[
+            priority_rank(literal(value, column.type)) if isinstance(column, priority_rank) else literal(value, column.type)
+            for column, value in zip(columns, decode_cursor(key, cursor))
+        ])
+        if direction == "asc":
+            query = query.where(tuple_(*columns) > last_values)
+        else:
+            query = query.where(tuple_(*columns) < last_values)
+
+    query = apply_order(query, key, search)
+    if select_columns is not None:
+        query = query.with_only_columns(*select_columns)
+
+    # Without a limit (only internal callers) the whole result is returned.
+    # Otherwise fetch one extra row to know whether another page exists, with the sort value for the cursor
+    if limit is not None:
+        sort_value = columns[0].expression if isinstance(columns[0], priority_rank) else columns[0]
+        query = query.add_columns(sort_value.label("sort_value"), Request.id.label("sort_id")).limit(limit + 1)
+    if archived:
+        query = with_archived(query)
+
+    rows = (await db.execute(query)).all()
+    if limit is None or len(rows) <= limit:
+        return page_items(rows, select_columns), None
+
+    rows = rows[:limit]
+    return page_items(rows, select_columns), encode_cursor(key, rows[-1].sort_value, rows[-1].sort_id)
+
+async def paginate_clients(db: AsyncSession, key: str, limit: Optional[int], cursor: Optional[str]) -> Tuple[list, Optional[str]]:
+
+    # Pages of client_directory_query as dicts, the cursor holds the sort value and id of the last client
+    column, direction = key.split(":")
+    after = decode_cursor(key, cursor) if cursor is not None else None
+    query = client_directory_query(column, direction == "desc", after, limit + 1 if limit is not None else None)
+    rows = [dict(row) for row in (await db.execute(query)).mappings()]
+    if limit is None or len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(key, rows[-1][column], rows[-1]["id"])
+
+def page_items(rows, select_columns: Optional[list]) -> list:
+
+    if select_columns is None:
+        return [row[0] for row in rows]
+    width = len(select_columns)
+    return [dict(zip(row._fields[:width], row[:width])) for row in rows]
+
+async def estimate_count(db: AsyncSession, query: Select) -> int:
+
+    # On PostgreSQL use the planner's row estimate instead of an exact COUNT(*)
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql":
+        compiled = query.compile(bind, compile_kwargs={"literal_binds": True})
+        connection = await db.connection()
+        plan = (await connection.exec_driver_sql(f"EXPLAIN {compiled}")).scalar()
+        return int(re.search(r"rows=(\d+)", plan).group(1))
+
+    return await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
@@ -1,7 +1,11 @@
-from pydantic import BaseModel, EmailStr
-from Enums import UserTypes, RequestTypes, RequestStatus, RequestPriorityTypes
+from pydantic import BaseModel, EmailStr, Field
+from Enums import UserTypes, RequestTypes, RequestStatus, RequestPriorityTypes, BulkStatusResultTypes, BatchGetResultTypes
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
+
+MAX_BULK_REQUESTS = 1000
+# Ids per batch lookup, they travel in the query string
+MAX_BATCH_GET = 100
 
 
 class SupportListUsersResponse(BaseModel):
@@ -9,6 +13,11 @@ class SupportListUsersResponse(BaseModel):
     name: str
     email: EmailStr
     userType: UserTypes
+    # Ticket counts and the latest ticket of the client
+    open_requests: int = 0
+    in_process_requests: int = 0
+    done_requests: int = 0
+    last_request_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
@@ -23,6 +32,9 @@ class ClientRequestCreate(BaseModel):
     class Config:
         orm_mode = True
 
+class ClientRequestBulkCreate(BaseModel):
+    requests: List[ClientRequestCreate] = Field(..., min_length=1, max_length=MAX_BULK_REQUESTS)
+
 class ClientRequestRead(BaseModel):
     id: int
     type: RequestTypes
@@ -42,6 +54,8 @@ class SupportGetAllRequestsResponse(BaseModel):
     priority: RequestPriorityTypes
     viewed: bool
     created_at: datetime
+    claimed_by: Optional[int] = None
+    claimed_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
@@ -62,6 +76,21 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    id: Optional[int] = None
+    userType: Optional[UserTypes] = None
+    name: Optional[str] = None
+    issued_at: Optional[int] = None
+    expires_at: Optional[int] = None
+
+# Authenticated user as resolved from the access token
+class CurrentUser(BaseModel):
+    id: int
+    name: str
+    email: str
+    userType: UserTypes
+
+    class Config:
+        orm_mode = True
 
 class UserResponse(BaseModel):
     id: int
@@ -86,4 +115,54 @@ class SupportRequestStatusUpdate(BaseModel):
 
     class Config:
         orm_mode = True
-    
\ No newline at end of file
+
+# Unknown keys are rejected: a misspelled field would otherwise widen the filter to everything
+class SupportRequestFilter(BaseModel):
+    type: Optional[RequestTypes] = None
+    status: Optional[RequestStatus] = None
+    priority: Optional[RequestPriorityTypes] = None
+    viewed: Optional[bool] = None
+
+    class Config:
+        extra = "forbid"
+
+# Either explicit ids or a filter selects the requests to move to `status`
+class SupportBulkStatusUpdate(BaseModel):
+    status: RequestStatus
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=MAX_BULK_REQUESTS)
+    filter: Optional[SupportRequestFilter] = None
+
+class BulkStatusResult(BaseModel):
+    id: int
+    result: BulkStatusResultTypes
+
+# A filter moves at most MAX_BULK_REQUESTS requests per call, `has_more` asks for another call
+class SupportBulkStatusUpdateResponse(BaseModel):
+    updated: int
+    results: List[BulkStatusResult]
+    has_more: bool = False
+    
+# Batch lookups report every id, `request` is only set when found
+class SupportBatchGetResult(BaseModel):
+    id: int
+    result: BatchGetResultTypes
+    request: Optional[SupportGetAllRequestsResponse] = None
+
+class SupportBatchGetResponse(BaseModel):
+    results: List[SupportBatchGetResult]
+
+class ClientBatchGetResult(BaseModel):
+    id: int
+    result: BatchGetResultTypes
+    request: Optional[ClientRequestRead] = None
+
+class ClientBatchGetResponse(BaseModel):
+    results: List[ClientBatchGetResult]
+
+# Ticket counts keyed by enum value
+class SupportStatsResponse(BaseModel):
+    total: int
+    status: Dict[RequestStatus, int]
+    priority: Dict[RequestPriorityTypes, int]
+    type: Dict[RequestTypes, int]
+    viewed: Dict[bool, int]
@@ -0,0 +1,195 @@
+from typing import List, Optional
+from sqlalchemy import Select, asc, case, desc, exists, false, func, literal_column, select, tuple_, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.util import ClauseAdapter
+from classes.User import User
+from classes.Request import Request
+from classes.ClientRequest import ClientRequest
+from classes.ArchivedRequest import ArchivedRequest
+from classes.ArchivedClientRequest import ArchivedClientRequest
+from Enums import UserTypes, RequestTypes, RequestStatus, RequestPriorityTypes
+from search import FULL_TEXT, search_condition
+
+# Query builders shared by the list endpoints and `manage.py explain`, and the
+# read-modify-write helper used by the status and edit endpoints
+
+def filter_requests(query: Select,
+                    type_enum: Optional[RequestTypes] = None,
+                    status_enum: Optional[RequestStatus] = None,
+                    priority_enum: Optional[RequestPriorityTypes] = None,
+                    viewed: Optional[bool] = None,
+                    search: Optional[str] = None) -> Select:
+
+    if type_enum is not None:
+        query = query.where(Request.type == type_enum)
+    if status_enum is not None:
+        query = query.where(Request.status == status_enum)
+    if priority_enum is not None:
+        query = query.where(Request.priority == priority_enum)
+    if viewed is not None:
+        query = query.where(Request.viewed == viewed)
+    if search:
+        query = query.where(search_condition(search))
+    return query
+
+def support_requests_query(**filters) -> Select:
+
+    return filter_requests(select(Request), **filters)
+
+def client_owns_request(client_id: int):
+
+    # Correlated EXISTS on client_requests, served by (client_id, request_id)
+    return exists().where(
+        ClientRequest.client_id == client_id,
+        ClientRequest.request_id == Request.id
+    )
+
+def client_requests_query(client_id: int, **filters) -> Select:
+
+    query = select(Request).join(ClientRequest, ClientRequest.request_id == Request.id).where(
+        ClientRequest.client_id == client_id
+    )
+    return filter_requests(query, **filters)
+
+def client_request_query(client_id: int, request_id: int) -> Select:
+
+    return select(Request).where(Request.id == request_id, client_owns_request(client_id))
+
+def client_batch_query(client_id: int, request_ids: List[int], *columns) -> Select:
+
+    # Ownership as a column: requests of other clients are reported, not left out
+    return select(*columns, client_owns_request(client_id).label("owned")).where(Request.id.in_(request_ids))
+
+def archive_union(live_table, archive_table, *extra_columns):
+
+    # Live rows and their archived counterparts under the live table's name
+    columns = [column.name for column in live_table.columns]
+    return union_all(
+        select(*[live_table.c[name] for name in columns], *[literal_column(f"{live_table.name}.{name}").label(name) for name in extra_columns]),
+        select(*[archive_table.c[name] for name in columns], *[literal_column(f"{archive_table.name}.{name}").label(name) for name in extra_columns])
+    ).subquery(live_table.name)
+
+def with_archived(query: Select) -> Select:
+
+    # The same query over live and archived requests: requests and client_requests are
+    # swapped for UNION ALLs with their archive tables. PostgreSQL pushes the filters into
+    # both sides and merges ordered index scans of both tables for a page
+    search_columns = ["search_vector"] if FULL_TEXT else []
+    requests = archive_union(Request.__table__, ArchivedRequest.__table__, *search_columns)
+    client_requests = archive_union(ClientRequest.__table__, ArchivedClientRequest.__table__)
+    return ClauseAdapter(requests).chain(ClauseAdapter(client_requests)).traverse(query)
+
+class priority_rank(FunctionElement):
+    # A priority (column or bound value) in declaration order, CAN_WAIT < MIDDLE < IMPORTANT.
+    # PostgreSQL enums already compare that way and keep using their indexes,
+    # SQLite stores the names and would compare them alphabetically
+    name = "priority_rank"
+    inherit_cache = True
+
+    def __init__(self, expression):
+        super().__init__(expression)
+        self.type = expression.type
+
+    @property
+    def expression(self):
+
+        return self.clauses.clauses[0]
+
+@compiles(priority_rank)
+def _compile_priority_rank(element, compiler, **kw):
+
+    return compiler.process(element.expression, **kw)
+
+@compiles(priority_rank, "sqlite")
+def _compile_priority_rank_sqlite(element, compiler, **kw):
+
+    ranks = case({member.name: member.value for member in RequestPriorityTypes}, value=element.expression)
+    return compiler.process(ranks, **kw)
+
+def queue_query() -> Select:
+
+    # Next ticket of the support queue: pending, highest priority first, then the oldest
+    return select(Request).where(Request.status == RequestStatus.PENDING).order_by(
+        priority_rank(Request.priority).desc(), Request.created_at, Request.id
+    )
+
+async def update_returning_old(db: AsyncSession, criteria: Select, values: dict, *old_columns,
+                               skip_locked: bool = False) -> List[dict]:
+
+    # Updates the requests matching `criteria` and returns the new rows plus the values
+    # `old_columns` had before the write, labelled old_<name>. With `skip_locked`, rows
+    # locked by other transactions are passed over instead of waited for
+    locked = criteria.with_only_columns(Request.id, *old_columns).order_by(Request.id).with_for_update(
+        skip_locked=skip_locked
+    )
+    returning = [*Request.__table__.columns]
+
+    if db.bind.dialect.name == "postgresql":
+        # One statement: UPDATE ... FROM (locked rows) RETURNING new and old values
+        old = locked.cte("old").prefix_with("MATERIALIZED")
+        query = update(Request).add_cte(old).where(Request.id == old.c.id).values(**values).returning(
+            *returning, *[old.c[column.name].label(f"old_{column.name}") for column in old_columns]
+        )
+        return [dict(row) for row in (await db.execute(query.execution_options(synchronize_session=False))).mappings()]
+
+    # SQLite cannot return columns of the FROM tables, read the old values first.
+    # It has no row locks either: take the database write lock before reading, so
+    # concurrent writers (queue claims in particular) wait instead of reading the same rows.
+    # The criteria are checked again all the same
+    await db.execute(update(Request).where(false()).values(id=Request.id).execution_options(synchronize_session=False))
+    old_rows = {row["id"]: row for row in (await db.execute(locked)).mappings()}
+    if not old_rows:
+        return []
+    query = update(Request).where(Request.id.in_(list(old_rows))).values(**values).returning(*returning)
+    if criteria.whereclause is not None:
+        query = query.where(criteria.whereclause)
+    rows = (await db.execute(query.execution_options(synchronize_session=False))).mappings()
+    return [
+        dict(row, **{f"old_{column.name}": old_rows[row["id"]][column.name] for column in old_columns})
+        for row in rows
+    ]
+
+def request_clients_query(request_ids: List[int]) -> Select:
+
+    # request_id -> client_id of the owning client
+    return select(ClientRequest.request_id, ClientRequest.client_id).where(
+        ClientRequest.request_id.in_(request_ids)
+    )
+
+def clients_query() -> Select:
+
+    # Only clients, not support users
+    return select(User).where(User.userType == UserTypes.CLIENT)
+
+CLIENT_SORT_COLUMNS = {"id": User.id, "name": User.name, "email": User.email}
+
+def client_directory_query(sort_by: str, descending: bool, after: Optional[tuple] = None,
+                           limit: Optional[int] = None) -> Select:
+
+    # One page of clients ordered by `sort_by` and id, continuing after the (value, id) of
+    # `after`, with their ticket counts per status and latest ticket time. The GROUP BY only
+    # covers the tickets of the page's clients, archived tickets included
+    sort_column = CLIENT_SORT_COLUMNS[sort_by]
+    keys = tuple_(sort_column, User.id)
+    page = clients_query().with_only_columns(User.id, User.name, User.email, User.userType)
+    if after is not None:
+        last = tuple_(*after, types=[sort_column.type, User.id.type])
+        page = page.where(keys < last if descending else keys > last)
+    order = desc if descending else asc
+    page = page.order_by(order(sort_column), order(User.id)).limit(limit)
+    clients = page.subquery("clients")
+
+    count = lambda status: func.count(Request.id).filter(Request.status == status)
+    query = select(
+        *clients.c,
+        count(RequestStatus.PENDING).label("open_requests"),
+        count(RequestStatus.IN_PROCESS).label("in_process_requests"),
+        count(RequestStatus.DONE).label("done_requests"),
+        func.max(Request.created_at).label("last_request_at"),
+    ).select_from(
+        clients.outerjoin(ClientRequest, ClientRequest.client_id == clients.c.id)
+        .outerjoin(Request, Request.id == ClientRequest.request_id)
+    ).group_by(*clients.c).order_by(order(clients.c[sort_by]), order(clients.c.id))
+    return with_archived(query)
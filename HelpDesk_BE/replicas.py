@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Optional
+from fastapi import Request as HTTPRequest
+from sqlalchemy import event, exc, text
+from sqlalchemy.orm import Session
+from database import AsyncSessionLocal, ReplicaSessionLocal, replica_engine
+
+logger = logging.getLogger(__name__)
+
+# Read-only routes take their session from get_read_db: the replica of DB_REPLICA_URL
+# while it is up and caught up, the primary otherwise. A user who just committed a write
+# reads from the primary for REPLICA_STICKY_SECONDS, so their own changes are visible.
+# The stickiness travels with the client, whichever worker it reaches next: responses
+# of committed writes carry the write time in X-Last-Write and clients send it back.
+
+# Replicas further behind than this are skipped until they catch up
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "1"))
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+LAST_WRITE_HEADER = "X-Last-Write"
+
+# Caught up when every received WAL record is replayed, a primary has no lag
+LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+# Connection failures of the replica, reads fall back to the primary
+REPLICA_ERRORS = (exc.DBAPIError, OSError, asyncio.TimeoutError)
+
+
+def last_write(http_request: HTTPRequest) -> Optional[float]:
+
+    # Unix time of the client's last write as it sent it back, anything else counts as none
+    try:
+        value = float(http_request.headers.get(LAST_WRITE_HEADER, ""))
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+class ReplicaRouter:
+
+    def __init__(self, engine, max_lag: float, interval: float, sticky_seconds: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.sticky_seconds = sticky_seconds
+        # Stays off until the first check succeeded
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self._task = None
+        event.listen(Session, "after_commit", self._after_commit)
+
+    def _after_commit(self, session: Session):
+
+        # get_current_user hands the request's response to its session
+        response = session.info.get("response")
+        if response is not None:
+            response.headers[LAST_WRITE_HEADER] = f"{time.time():.3f}"
+
+    def use_replica(self, last_write: Optional[float]) -> bool:
+
+        if self.engine is None or not self.healthy:
+            return False
+        return last_write is None or time.time() - last_write > self.sticky_seconds
+
+    def mark_down(self):
+
+        # Until the next successful check
+        self.healthy = False
+
+    def sessionmaker(self, last_write: Optional[float]):
+
+        return ReplicaSessionLocal if self.use_replica(last_write) else AsyncSessionLocal
+
+    async def check(self):
+
+        try:
+            async with self.engine.connect() as connection:
+                if connection.dialect.name == "postgresql":
+                    lag = float(await connection.scalar(LAG_QUERY))
+                else:
+                    # SQLite copies have no replication to measure, reachable is enough
+                    await connection.execute(text("SELECT 1"))
+                    lag = 0.0
+        except REPLICA_ERRORS:
+            if self.healthy:
+                logger.exception("Read replica is unreachable, reading from the primary")
+            self.healthy = False
+            self.lag_seconds = None
+            return
+
+        if self.healthy and lag > self.max_lag:
+            logger.warning("Read replica is %.1fs behind, reading from the primary", lag)
+        self.lag_seconds = lag
+        self.healthy = lag <= self.max_lag
+
+    async def _run(self):
+
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+
+        if self.engine is not None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> dict:
+
+        return {"healthy": self.healthy, "lag_seconds": self.lag_seconds}
+
+
+replica_router = ReplicaRouter(
+    replica_engine,
+    max_lag=REPLICA_MAX_LAG_SECONDS,
+    interval=REPLICA_CHECK_SECONDS,
+    sticky_seconds=REPLICA_STICKY_SECONDS,
+)
+
+async def get_read_db(http_request: HTTPRequest):
+
+    # Session for routes that only read. Writes through it would be lost on a replica
+    if replica_router.use_replica(last_write(http_request)):
+        async with ReplicaSessionLocal() as db:
+            try:
+                # Connect up front, a replica that went down since the last check is skipped
+                await db.connection()
+            except REPLICA_ERRORS:
+                logger.exception("Read replica connection failed, reading from the primary")
+                replica_router.mark_down()
+            else:
+                yield db
+                return
+
+    async with AsyncSessionLocal() as db:
+        yield db
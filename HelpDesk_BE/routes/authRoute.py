@@ -1,14 +1,15 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from database import get_db
+from database import get_async_db
 from pydanticModels import UserSignUp, UserLogin, Token, UserResponse
 from auth import (
     authenticate_user, 
     create_access_token, 
     create_user, 
     get_user_by_email,
+    token_claims,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     get_current_user
 )
@@ -16,9 +17,9 @@ from auth import (
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 @router.post("/signup", response_model=UserResponse)
-def sign_up(user_data: UserSignUp, db: Session = Depends(get_db)):
+async def sign_up(user_data: UserSignUp, db: AsyncSession = Depends(get_async_db)):
     # Existing user check
-    existing_user = get_user_by_email(db, user_data.email)
+    existing_user = await get_user_by_email(db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -27,7 +28,7 @@ def sign_up(user_data: UserSignUp, db: Session = Depends(get_db)):
     
     try:
         # Create new user
-        user = create_user(
+        user = await create_user(
             db=db,
             name=user_data.name,
             email=user_data.email,
@@ -36,15 +37,15 @@ def sign_up(user_data: UserSignUp, db: Session = Depends(get_db)):
         return user
         
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Error while creating user"
         )
 
 @router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, user_credentials.email, user_credentials.password)
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user(db, user_credentials.email, user_credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -54,11 +55,11 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=token_claims(user), expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user = Depends(get_current_user)):
+async def get_current_user_info(current_user = Depends(get_current_user)):
     return current_user 
\ No newline at end of file
@@ -1,22 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
+from fastapi import Request as HTTPRequest
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert
+from database import get_async_db
+from replicas import get_read_db
 from classes.User import User
 from classes.Request import Request
 from classes.ClientRequest import ClientRequest
-from pydanticModels import ClientRequestCreate, ClientRequestRead, ClientRequestUpdate
+from pydanticModels import ClientRequestCreate, ClientRequestBulkCreate, ClientRequestRead, ClientRequestUpdate, ClientBatchGetResponse, MAX_BATCH_GET
 from auth import get_current_client
 from typing import List, Optional
-from Enums import RequestTypes, RequestStatus, RequestPriorityTypes
-from sqlalchemy import desc, asc
+from Enums import RequestTypes, RequestStatus, RequestPriorityTypes, BatchGetResultTypes
+from queries import client_requests_query, client_request_query, client_batch_query, update_returning_old, with_archived
+from events import publish, request_event, event_stream, client_channel
+from stats import apply_delta, created, changed
+from etags import bump_versions, conditional_get, client_scope, request_scopes
+from search import MAX_SEARCH_LENGTH
+from serialization import model_columns, json_response, request_previews
+from viewed import viewed_buffer
+from idempotency import IDEMPOTENCY_KEY_MAX_LENGTH, claim_key, request_fingerprint, save_response
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER, sort_key, paginate, estimate_count
 
 router = APIRouter(prefix="/client", tags=["Client"])
 
 @router.post("/request/", response_model=ClientRequestRead)
-def create_request(req: ClientRequestCreate,
+async def create_request(req: ClientRequestCreate,
                     current_user: User = Depends(get_current_client),
-                    db: Session = Depends(get_db)):
+                    db: AsyncSession = Depends(get_async_db),
+                    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH,
+                                                            description="Retries with the same key get the first response back")):
     
+    if idempotency_key is not None:
+        replay = await claim_key(db, current_user.id, idempotency_key, request_fingerprint("create", req))
+        if replay is not None:
+            return replay
+
     # Create new request
     request = Request(
         type = req.type,
@@ -27,8 +46,8 @@ def create_request(req: ClientRequestCreate,
     )
 
     db.add(request)
-    db.commit()
-    db.refresh(request)
+    # Flush to get the request id, the link is committed in the same transaction
+    await db.flush()
 
     # Create ClientRequest
     client_request = ClientRequest(
@@ -37,23 +56,81 @@ def create_request(req: ClientRequestCreate,
     )
 
     db.add(client_request)
-    db.commit()
+    await apply_delta(db, created([request]))
+    await bump_versions(db, request_scopes([current_user.id]))
+    await publish(db, [request_event("request.created", request, current_user.id)])
+    if idempotency_key is not None:
+        await save_response(db, current_user.id, idempotency_key, ClientRequestRead.model_validate(request, from_attributes=True))
+    await db.commit()
 
     return request
 
+@router.post("/requests/bulk", response_model=List[ClientRequestRead])
+async def create_requests_bulk(bulk: ClientRequestBulkCreate,
+                    current_user: User = Depends(get_current_client),
+                    db: AsyncSession = Depends(get_async_db),
+                    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH,
+                                                            description="Retries with the same key get the first response back")):
+
+    if idempotency_key is not None:
+        replay = await claim_key(db, current_user.id, idempotency_key, request_fingerprint("bulk_create", bulk))
+        if replay is not None:
+            return replay
+
+    # Batched multi-row INSERT ... RETURNING, rows come back in input order
+    requests = (await db.scalars(
+        insert(Request).returning(Request, sort_by_parameter_order=True),
+        [
+            {
+                "type": req.type,
+                "request": req.request,
+                "priority": req.priority,
+                "status": req.status,
+                "viewed": req.viewed
+            }
+            for req in bulk.requests
+        ]
+    )).all()
+
+    await db.execute(
+        insert(ClientRequest),
+        [{"client_id": current_user.id, "request_id": request.id} for request in requests]
+    )
+    await apply_delta(db, created(requests))
+    await bump_versions(db, request_scopes([current_user.id]))
+    await publish(db, [request_event("request.created", request, current_user.id) for request in requests])
+    if idempotency_key is not None:
+        await save_response(db, current_user.id, idempotency_key, [ClientRequestRead.model_validate(request, from_attributes=True) for request in requests])
+    await db.commit()
+
+    return requests
+
 @router.get("/my-requests/", response_model=List[ClientRequestRead])
-def get_my_requests(
+async def get_my_requests(
+    response: Response,
+    http_request: HTTPRequest,
     current_user: User = Depends(get_current_client),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     # Filtering parameters
     type: Optional[int] = Query(None, description="Filter according to type (0: REVIEW, 1: DEVELOPMENT, 2: DISCUSS)"),
     status: Optional[int] = Query(None, description="Filter according to status (0: PENDING, 1: IN_PROCESS, 2: DONE)"),
     priority: Optional[int] = Query(None, description="Filter according to priority (0: CAN_WAIT, 1: MIDDLE, 2: IMPORTANT)"),
     viewed: Optional[bool] = Query(None, description="Filter according to view status"),
+    q: Optional[str] = Query(None, max_length=MAX_SEARCH_LENGTH, description="Search in the request text"),
 
     # Sorting parameters
-    sort_by: Optional[str] = Query("created_at", description="Criteria: 'priority' or 'created_at'"),
-    sort_order: Optional[str] = Query("desc", description="Ordering direction: 'asc' or 'desc'")
+    sort_by: Optional[str] = Query(None, description="Criteria: 'priority', 'created_at' or 'relevance' (default when searching, otherwise 'created_at')"),
+    sort_order: Optional[str] = Query("desc", description="Ordering direction: 'asc' or 'desc'"),
+
+    # Pagination parameters
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size, the next page is fetched with the cursor from the X-Next-Cursor header"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor taken from the X-Next-Cursor header of the previous page"),
+    include_total: bool = Query(False, description="Return an estimated total in the X-Total-Count-Estimate header"),
+    include_archived: bool = Query(False, description="Also list archived requests"),
+
+    # Response shape
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. 'id,status,priority' (id is always returned)"),
+    summary: bool = Query(False, description="Return a short request_preview instead of the full request text")
 ):
 
     type_enum = None
@@ -68,99 +145,134 @@ def get_my_requests(
         if priority is not None:
             priority_enum = RequestPriorityTypes(priority)
     except ValueError as e:
+        # `status` is the filter parameter here, use plain status codes
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=400,
             detail=f"Invalid value: {str(e)}"
         )
     
-    # Find client requests from ClientRequests table
-    client_requests = db.query(ClientRequest).filter(
-        ClientRequest.client_id == current_user.id
-    ).all()
+    # Blank searches are ignored
+    search = q.strip() if q and q.strip() else None
     
-    # Fetch request_ids
-    request_ids = [cr.request_id for cr in client_requests]
+    # Nothing changed for this client since the If-None-Match version
+    not_modified = await conditional_get(db, http_request, response, client_scope(current_user.id))
+    if not_modified:
+        return not_modified
     
-    if not request_ids:
-        return []
-    
-    query = db.query(Request).filter(Request.id.in_(request_ids))
+    # Client's requests joined through ClientRequests table, with filtering
+    query = client_requests_query(
+        current_user.id,
+        type_enum=type_enum,
+        status_enum=status_enum,
+        priority_enum=priority_enum,
+        viewed=viewed,
+        search=search
+    )
     
-    # Filtering
-    if type_enum is not None:
-        query = query.filter(Request.type == type_enum)
-    if status_enum is not None:
-        query = query.filter(Request.status == status_enum)
-    if priority_enum is not None:
-        query = query.filter(Request.priority == priority_enum)
-    if viewed is not None:
-        query = query.filter(Request.viewed == viewed)
+    if include_total:
+        response.headers[TOTAL_ESTIMATE_HEADER] = str(await estimate_count(db, with_archived(query) if include_archived else query))
     
-    # Sorting
-    if sort_by == "priority":
-        if sort_order == "asc":
-            query = query.order_by(asc(Request.priority))
-        else:
-            query = query.order_by(desc(Request.priority))
-    else:  # created_at
-        if sort_order == "asc":
-            query = query.order_by(asc(Request.created_at))
-        else:
-            query = query.order_by(desc(Request.created_at))
+    # Sorting and keyset pagination (id breaks ties)
+    # Plain column rows encoded with orjson, see serialization.py
+    requests, next_cursor = await paginate(
+        db, query, sort_key(sort_by, sort_order, search), limit, cursor, search,
+        select_columns=model_columns(Request, ClientRequestRead, fields, summary),
+        archived=include_archived
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
-    requests = query.all()
-    return requests
+    # Viewed marks not written yet
+    return json_response(request_previews(viewed_buffer.overlay(requests, viewed)), response)
 
 @router.get("/request/{request_id}", response_model=ClientRequestRead)
-def get_single_request(
+async def get_single_request(
     request_id: int,
+    response: Response,
+    http_request: HTTPRequest,
     current_user: User = Depends(get_current_client),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db),
+    include_archived: bool = Query(False, description="Also look the request up in the archive")
 ):
 
-    # Check if specified request is current user's
-    client_request = db.query(ClientRequest).filter(
-        ClientRequest.client_id == current_user.id,
-        ClientRequest.request_id == request_id
-    ).first()
+    not_modified = await conditional_get(db, http_request, response, client_scope(current_user.id))
+    if not_modified:
+        return not_modified
+
+    # Fetch request only if it is current user's
+    query = client_request_query(current_user.id, request_id).with_only_columns(*Request.__table__.columns)
+    if include_archived:
+        query = with_archived(query)
+    request = (await db.execute(query)).mappings().first()
     
-    if not client_request:
+    if not request:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Couldn't find request"
         )
     
-    # Fetch request
-    request = db.query(Request).filter(Request.id == request_id).first()
+    return viewed_buffer.overlay([dict(request)])[0]
+
+@router.get("/requests/batch", response_model=ClientBatchGetResponse)
+async def get_requests_batch(
+    response: Response,
+    http_request: HTTPRequest,
+    current_user: User = Depends(get_current_client),
+    db: AsyncSession = Depends(get_read_db),
+    ids: List[int] = Query(..., min_length=1, max_length=MAX_BATCH_GET, description="Request ids, e.g. ids=1&ids=2"),
+    include_archived: bool = Query(False, description="Also look the requests up in the archive")
+):
+
+    not_modified = await conditional_get(db, http_request, response, client_scope(current_user.id))
+    if not_modified:
+        return not_modified
+
+    # Lookup and ownership check of the whole batch in one query
+    ids = list(dict.fromkeys(ids))
+    query = client_batch_query(current_user.id, ids, *model_columns(Request, ClientRequestRead))
+    if include_archived:
+        query = with_archived(query)
+    rows = {row["id"]: dict(row) for row in (await db.execute(query)).mappings()}
     
-    if not request:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Couldn't find request"
-        )
+    results = []
+    for request_id in ids:
+        request = rows.get(request_id)
+        if request is None:
+            results.append({"id": request_id, "result": BatchGetResultTypes.NOT_FOUND, "request": None})
+        elif not request.pop("owned"):
+            results.append({"id": request_id, "result": BatchGetResultTypes.FORBIDDEN, "request": None})
+        else:
+            results.append({"id": request_id, "result": BatchGetResultTypes.FOUND, "request": request})
     
-    return request
+    # Viewed marks not written yet
+    viewed_buffer.overlay([result["request"] for result in results if result["request"]])
+    return json_response({"results": results}, response)
 
 @router.put("/request/{request_id}", response_model=ClientRequestRead)
-def update_request(
+async def update_request(
     request_id: int,
     request_update: ClientRequestUpdate,
     current_user: User = Depends(get_current_client),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
 
-    client_request = db.query(ClientRequest).filter(
-        ClientRequest.client_id == current_user.id,
-        ClientRequest.request_id == request_id
-    ).first()
+    update_data = request_update.dict(exclude_unset=True)
     
-    if not client_request:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Couldn't find request"
+    if not update_data:
+        request = await db.scalar(client_request_query(current_user.id, request_id))
+    else:
+        # Ownership check and update in one statement, the previous type and priority feed the stats
+        rows = await update_returning_old(
+            db, client_request_query(current_user.id, request_id), update_data, Request.type, Request.priority
         )
-    
-    request = db.query(Request).filter(Request.id == request_id).first()
+        request = rows[0] if rows else None
+        if request:
+            delta = changed("type", request["old_type"], request["type"])
+            delta.update(changed("priority", request["old_priority"], request["priority"]))
+            await apply_delta(db, delta)
+            await bump_versions(db, request_scopes([current_user.id]))
+            await publish(db, [request_event("request.updated", request, current_user.id)])
+        await db.commit()
     
     if not request:
         raise HTTPException(
@@ -168,13 +280,14 @@ def update_request(
             detail="Couldn't find request"
         )
     
-    update_data = request_update.dict(exclude_unset=True)
-    
-    for field, value in update_data.items():
-        setattr(request, field, value)
-    
-    db.commit()
-    db.refresh(request)
-    
     return request
 
+@router.get("/events")
+async def request_events(current_user: User = Depends(get_current_client)):
+
+    # Server-Sent Events for the client's own requests
+    return StreamingResponse(
+        event_stream(client_channel(current_user.id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
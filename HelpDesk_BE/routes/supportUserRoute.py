@@ -1,36 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi import Request as HTTPRequest
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from replicas import get_read_db, last_write, replica_router
 from classes.User import User
 from classes.Request import Request
-from pydanticModels import SupportListUsersResponse, SupportGetAllRequestsResponse, SupportRequestStatusUpdate
+from classes.ArchivedRequest import ArchivedRequest
+from pydanticModels import SupportListUsersResponse, SupportGetAllRequestsResponse, SupportRequestStatusUpdate, SupportBulkStatusUpdate, SupportBulkStatusUpdateResponse, SupportBatchGetResponse, SupportStatsResponse, MAX_BATCH_GET, MAX_BULK_REQUESTS
 from auth import get_current_support_user
+from collections import Counter
 from typing import List, Optional
-from Enums import RequestTypes, RequestStatus, RequestPriorityTypes
-from sqlalchemy import desc, asc
+from Enums import RequestTypes, RequestStatus, RequestPriorityTypes, BulkStatusResultTypes, BatchGetResultTypes
+from queries import filter_requests, support_requests_query, clients_query, queue_query, update_returning_old, with_archived
+from events import publish_request_events, event_stream, SUPPORT_CHANNEL
+from stats import apply_delta, changed, read_stats
+from etags import bump_versions, conditional_get, request_scopes, REQUESTS_SCOPE, CLIENTS_SCOPE
+from search import MAX_SEARCH_LENGTH
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER, sort_key, client_sort_key, apply_order, paginate, paginate_clients, estimate_count
+from export import EXPORT_FORMATS, export_rows
+from serialization import model_columns, json_response, request_previews
+from viewed import viewed_buffer
 
 router = APIRouter(prefix="/support", tags=["Support"])
 
+def status_values(new_status: RequestStatus) -> dict:
+
+    # Tickets put back to PENDING return to the queue unclaimed
+    values = {"status": new_status}
+    if new_status == RequestStatus.PENDING:
+        values.update(claimed_by=None, claimed_at=None)
+    return values
+
 @router.get("/clients/", response_model=List[SupportListUsersResponse])
-def list_users(current_user: User = Depends(get_current_support_user),
-               db: Session = Depends(get_db)):
-    # Only return clients, not support users
-    from Enums import UserTypes
-    return db.query(User).filter(User.userType == UserTypes.CLIENT).all()
+async def list_users(
+    response: Response,
+    http_request: HTTPRequest,
+    current_user: User = Depends(get_current_support_user),
+    db: AsyncSession = Depends(get_read_db),
+    # Sorting parameters
+    sort_by: Optional[str] = Query(None, description="Sorting criteria: 'id' (default, registration order), 'name' or 'email'"),
+    sort_order: Optional[str] = Query("asc", description="Sorting direction: 'asc' or 'desc'"),
+
+    # Pagination parameters
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size, the next page is fetched with the cursor from the X-Next-Cursor header"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor taken from the X-Next-Cursor header of the previous page"),
+    include_total: bool = Query(False, description="Return an estimated total in the X-Total-Count-Estimate header")
+):
+
+    # The ticket aggregates change with every ticket write
+    not_modified = await conditional_get(db, http_request, response, CLIENTS_SCOPE, REQUESTS_SCOPE)
+    if not_modified:
+        return not_modified
+    
+    if include_total:
+        response.headers[TOTAL_ESTIMATE_HEADER] = str(await estimate_count(db, clients_query()))
+    
+    # Only clients, not support users, with their ticket counts from one GROUP BY per page
+    clients, next_cursor = await paginate_clients(db, client_sort_key(sort_by, sort_order), limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    return json_response(clients, response)
 
 @router.get("/requests/", response_model=List[SupportGetAllRequestsResponse])
-def get_all_requests(
+async def get_all_requests(
+    response: Response,
+    http_request: HTTPRequest,
     current_user: User = Depends(get_current_support_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     # Filtering parameters
     type: Optional[int] = Query(None, description="Filter according to type (0: REVIEW, 1: DEVELOPMENT, 2: DISCUSS)"),
     status: Optional[int] = Query(None, description="Filter according to status (0: PENDING, 1: IN_PROCESS, 2: DONE)"),
     priority: Optional[int] = Query(None, description="Filter according to priority (0: CAN_WAIT, 1: MIDDLE, 2: IMPORTANT)"),
     viewed: Optional[bool] = Query(None, description="Filter according to viewed or not"),
+    q: Optional[str] = Query(None, max_length=MAX_SEARCH_LENGTH, description="Search in the request text"),
     
     # Sorting parameters
-    sort_by: Optional[str] = Query("created_at", description="Sorting criteria: 'priority' or 'created_at'"),
-    sort_order: Optional[str] = Query("desc", description="Sorting direction: 'asc' or 'desc'")
+    sort_by: Optional[str] = Query(None, description="Sorting criteria: 'priority', 'created_at' or 'relevance' (default when searching, otherwise 'created_at')"),
+    sort_order: Optional[str] = Query("desc", description="Sorting direction: 'asc' or 'desc'"),
+
+    # Pagination parameters
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size, the next page is fetched with the cursor from the X-Next-Cursor header"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor taken from the X-Next-Cursor header of the previous page"),
+    include_total: bool = Query(False, description="Return an estimated total in the X-Total-Count-Estimate header"),
+    include_archived: bool = Query(False, description="Also list archived requests"),
+
+    # Response shape
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. 'id,status,priority' (id is always returned)"),
+    summary: bool = Query(False, description="Return a short request_preview instead of the full request text")
 ):
 
     type_enum = None
@@ -45,44 +104,113 @@ def get_all_requests(
         if priority is not None:
             priority_enum = RequestPriorityTypes(priority)
     except ValueError as e:
+        # `status` is the filter parameter here, use plain status codes
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=400,
             detail=f"Invalid value: {str(e)}"
         )
     
-    query = db.query(Request)
-    
-    if type_enum is not None:
-        query = query.filter(Request.type == type_enum)
-    if status_enum is not None:
-        query = query.filter(Request.status == status_enum)
-    if priority_enum is not None:
-        query = query.filter(Request.priority == priority_enum)
-    if viewed is not None:
-        query = query.filter(Request.viewed == viewed)
-    
-    if sort_by == "priority":
-        if sort_order == "asc":
-            query = query.order_by(asc(Request.priority))
-        else:
-            query = query.order_by(desc(Request.priority))
-    else:  # created_at
-        if sort_order == "asc":
-            query = query.order_by(asc(Request.created_at))
-        else:
-            query = query.order_by(desc(Request.created_at))
-    
-    requests = query.all()
-    return requests
+    # Blank searches are ignored
+    search = q.strip() if q and q.strip() else None
+    
+    # Nothing changed since the If-None-Match version
+    not_modified = await conditional_get(db, http_request, response, REQUESTS_SCOPE)
+    if not_modified:
+        return not_modified
+    
+    query = support_requests_query(
+        type_enum=type_enum,
+        status_enum=status_enum,
+        priority_enum=priority_enum,
+        viewed=viewed,
+        search=search
+    )
+    
+    if include_total:
+        response.headers[TOTAL_ESTIMATE_HEADER] = str(await estimate_count(db, with_archived(query) if include_archived else query))
+    
+    # Sorting and keyset pagination (id breaks ties)
+    # Plain column rows encoded with orjson, see serialization.py
+    requests, next_cursor = await paginate(
+        db, query, sort_key(sort_by, sort_order, search), limit, cursor, search,
+        select_columns=model_columns(Request, SupportGetAllRequestsResponse, fields, summary),
+        archived=include_archived
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    # Viewed marks not written yet
+    return json_response(request_previews(viewed_buffer.overlay(requests, viewed)), response)
+
+@router.get("/requests/export")
+async def export_requests(
+    http_request: HTTPRequest,
+    current_user: User = Depends(get_current_support_user),
+    # Same filters and ordering as /requests/
+    type: Optional[int] = Query(None, description="Filter according to type (0: REVIEW, 1: DEVELOPMENT, 2: DISCUSS)"),
+    status: Optional[int] = Query(None, description="Filter according to status (0: PENDING, 1: IN_PROCESS, 2: DONE)"),
+    priority: Optional[int] = Query(None, description="Filter according to priority (0: CAN_WAIT, 1: MIDDLE, 2: IMPORTANT)"),
+    viewed: Optional[bool] = Query(None, description="Filter according to viewed or not"),
+    q: Optional[str] = Query(None, max_length=MAX_SEARCH_LENGTH, description="Search in the request text"),
+    sort_by: Optional[str] = Query(None, description="Sorting criteria: 'priority', 'created_at' or 'relevance' (default when searching, otherwise 'created_at')"),
+    sort_order: Optional[str] = Query("desc", description="Sorting direction: 'asc' or 'desc'"),
+    include_archived: bool = Query(False, description="Also export archived requests"),
+    format: str = Query("ndjson", description="Output format: 'ndjson' or 'csv'")
+):
+
+    # `status` is the filter parameter here, use plain status codes
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format, use 'ndjson' or 'csv'")
+
+    try:
+        type_enum = RequestTypes(type) if type is not None else None
+        status_enum = RequestStatus(status) if status is not None else None
+        priority_enum = RequestPriorityTypes(priority) if priority is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid value: {str(e)}")
+
+    search = q.strip() if q and q.strip() else None
+    query = support_requests_query(
+        type_enum=type_enum,
+        status_enum=status_enum,
+        priority_enum=priority_enum,
+        viewed=viewed,
+        search=search
+    )
+    query = apply_order(query, sort_key(sort_by, sort_order, search), search)
+
+    return StreamingResponse(
+        export_rows(
+            query, format, archived=include_archived, viewed=viewed,
+            session_factory=replica_router.sessionmaker(last_write(http_request))
+        ),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="requests.{format}"'}
+    )
 
 @router.get("/request/{request_id}", response_model=SupportGetAllRequestsResponse)
-def get_single_request(
+async def get_single_request(
     request_id: int,
+    response: Response,
+    http_request: HTTPRequest,
     current_user: User = Depends(get_current_support_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db),
+    include_archived: bool = Query(False, description="Also look the request up in the archive")
 ):
 
-    request = db.query(Request).filter(Request.id == request_id).first()
+    not_modified = await conditional_get(db, http_request, response, REQUESTS_SCOPE)
+    if not_modified:
+        return not_modified
+
+    request = (await db.execute(select(*Request.__table__.columns).where(Request.id == request_id))).mappings().first()
+    
+    if not request and include_archived:
+        # Archived requests are read-only, returned as they are
+        request = (await db.execute(
+            select(*ArchivedRequest.__table__.columns).where(ArchivedRequest.id == request_id)
+        )).mappings().first()
+        if request:
+            return request
     
     if not request:
         raise HTTPException(
@@ -90,33 +218,200 @@ def get_single_request(
             detail="Couldn't find request"
         )
     
-    # Viewed = true when the request is viewed by support user
-    if not request.viewed:
-        request.viewed = True
-        db.commit()
-        db.refresh(request)
+    # Viewed = true when the request is viewed by support user.
+    # Written behind in batches by viewed_buffer, the response shows it right away
+    request = dict(request)
+    if not request["viewed"]:
+        viewed_buffer.mark(request_id)
+        request["viewed"] = True
     
     return request
 
+@router.get("/requests/batch", response_model=SupportBatchGetResponse)
+async def get_requests_batch(
+    response: Response,
+    http_request: HTTPRequest,
+    current_user: User = Depends(get_current_support_user),
+    db: AsyncSession = Depends(get_read_db),
+    ids: List[int] = Query(..., min_length=1, max_length=MAX_BATCH_GET, description="Request ids, e.g. ids=1&ids=2"),
+    include_archived: bool = Query(False, description="Also look the requests up in the archive")
+):
+
+    not_modified = await conditional_get(db, http_request, response, REQUESTS_SCOPE)
+    if not_modified:
+        return not_modified
+
+    # One lookup for the whole batch instead of a detail call per ticket
+    ids = list(dict.fromkeys(ids))
+    columns = model_columns(Request, SupportGetAllRequestsResponse)
+    found = {row["id"]: dict(row) for row in (await db.execute(
+        select(*columns).where(Request.id.in_(ids))
+    )).mappings()}
+    
+    # Viewed by support, written behind like the single request endpoint
+    for request in found.values():
+        if not request["viewed"]:
+            viewed_buffer.mark(request["id"])
+            request["viewed"] = True
+    
+    missing = [request_id for request_id in ids if request_id not in found]
+    if missing and include_archived:
+        # Archived requests are read-only, returned as they are
+        found.update((row["id"], dict(row)) for row in (await db.execute(
+            select(*model_columns(ArchivedRequest, SupportGetAllRequestsResponse)).where(ArchivedRequest.id.in_(missing))
+        )).mappings())
+    
+    results = [
+        {"id": request_id, "result": BatchGetResultTypes.FOUND, "request": found[request_id]}
+        if request_id in found else
+        {"id": request_id, "result": BatchGetResultTypes.NOT_FOUND, "request": None}
+        for request_id in ids
+    ]
+    return json_response({"results": results}, response)
+
 @router.put("/request/{request_id}/status", response_model=SupportGetAllRequestsResponse)
-def update_request_status(
+async def update_request_status(
     request_id: int,
     status_update: SupportRequestStatusUpdate,
     current_user: User = Depends(get_current_support_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
 
-    request = db.query(Request).filter(Request.id == request_id).first()
+    rows = await update_returning_old(
+        db, select(Request).where(Request.id == request_id), status_values(status_update.status), Request.status
+    )
     
-    if not request:
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Couldn't find request"
         )
     
-    request.status = status_update.status
+    request = rows[0]
+    await apply_delta(db, changed("status", request["old_status"], request["status"]))
+    owners = await publish_request_events(db, "request.status_changed", [request])
+    await bump_versions(db, request_scopes(owners.values()))
+    
+    await db.commit()
+    
+    return request
+
+@router.post("/queue/next", response_model=SupportGetAllRequestsResponse,
+             responses={204: {"description": "No pending requests"}})
+async def claim_next_request(
+    current_user: User = Depends(get_current_support_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+
+    # Takes the next pending ticket and moves it to IN_PROCESS for the current user.
+    # Tickets being claimed by other agents are skipped, nobody waits on their locks
+    rows = await update_returning_old(
+        db,
+        queue_query().limit(1),
+        {"status": RequestStatus.IN_PROCESS, "claimed_by": current_user.id, "claimed_at": func.now()},
+        Request.status,
+        skip_locked=True
+    )
+    
+    if not rows:
+        # Queue is empty
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
     
-    db.commit()
-    db.refresh(request)
+    request = rows[0]
+    await apply_delta(db, changed("status", request["old_status"], request["status"]))
+    owners = await publish_request_events(db, "request.status_changed", [request])
+    await bump_versions(db, request_scopes(owners.values()))
     
-    return request
\ No newline at end of file
+    await db.commit()
+    
+    return request
+
+@router.put("/requests/status", response_model=SupportBulkStatusUpdateResponse)
+async def update_requests_status_bulk(
+    bulk_update: SupportBulkStatusUpdate,
+    current_user: User = Depends(get_current_support_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+
+    if (bulk_update.ids is None) == (bulk_update.filter is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either ids or filter"
+        )
+
+    # Set-based UPDATE ... RETURNING, rows already in the target status are left alone
+    query = select(Request).where(Request.status != bulk_update.status)
+    if bulk_update.ids is not None:
+        ids = list(dict.fromkeys(bulk_update.ids))
+        query = query.where(Request.id.in_(ids))
+    else:
+        filters = bulk_update.filter
+        if not filters.model_dump(exclude_none=True):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Filter needs at least one field, an empty filter matches every request"
+            )
+        query = filter_requests(
+            query,
+            type_enum=filters.type,
+            status_enum=filters.status,
+            priority_enum=filters.priority,
+            viewed=filters.viewed
+        )
+
+    # Filters are capped like id lists, the oldest matches first
+    criteria = query if bulk_update.ids is not None else query.order_by(Request.id).limit(MAX_BULK_REQUESTS)
+    updated_rows = await update_returning_old(db, criteria, status_values(bulk_update.status), Request.status)
+    updated_ids = [row["id"] for row in updated_rows]
+
+    # Moved requests no longer match, anything still matching is left for the next call
+    has_more = False
+    if bulk_update.ids is None and len(updated_rows) == MAX_BULK_REQUESTS:
+        has_more = await db.scalar(select(query.exists()))
+
+    results = [{"id": request_id, "result": BulkStatusResultTypes.UPDATED} for request_id in updated_ids]
+
+    # Tell apart ids that already had the status from ids that do not exist
+    if bulk_update.ids is not None:
+        updated = set(updated_ids)
+        remaining = [request_id for request_id in ids if request_id not in updated]
+        existing = set()
+        if remaining:
+            existing = set((await db.scalars(select(Request.id).where(Request.id.in_(remaining)))).all())
+
+        results_by_id = {result["id"]: result for result in results}
+        results = [
+            results_by_id.get(request_id) or {
+                "id": request_id,
+                "result": BulkStatusResultTypes.UNCHANGED if request_id in existing else BulkStatusResultTypes.NOT_FOUND
+            }
+            for request_id in ids
+        ]
+
+    if updated_rows:
+        delta = Counter()
+        for row in updated_rows:
+            delta.update(changed("status", row["old_status"], row["status"]))
+        await apply_delta(db, delta)
+        owners = await publish_request_events(db, "request.status_changed", updated_rows)
+        await bump_versions(db, request_scopes(owners.values()))
+    await db.commit()
+
+    return {"updated": len(updated_ids), "results": results, "has_more": has_more}
+
+@router.get("/stats", response_model=SupportStatsResponse)
+async def get_stats(current_user: User = Depends(get_current_support_user),
+                    db: AsyncSession = Depends(get_read_db)):
+
+    # Read from the maintained counters, no scan of the requests table
+    return await read_stats(db)
+
+@router.get("/events")
+async def request_events(current_user: User = Depends(get_current_support_user)):
+
+    # Server-Sent Events for every request change
+    return StreamingResponse(
+        event_stream(SUPPORT_CHANNEL),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,46 @@
+import os
+from sqlalchemy import Float, and_, func, literal, literal_column, make_url, or_
+from classes.Request import Request
+from database import DB_URL
+
+# Ticket body search for the list endpoints. PostgreSQL matches the stored tsvector
+# column of migration 0005 (GIN indexed) and ranks with ts_rank_cd, SQLite falls back
+# to LIKE on every word without ranking.
+
+MAX_SEARCH_LENGTH = 200
+
+# Must match the text search configuration of the generated search_vector column
+SEARCH_CONFIG = "english"
+
+# Also match substrings and typos through the pg_trgm index, needs the extension
+SEARCH_TRIGRAM = os.getenv("SEARCH_TRIGRAM", "false").lower() == "true"
+
+FULL_TEXT = make_url(DB_URL).get_backend_name() == "postgresql"
+
+search_vector = literal_column("requests.search_vector")
+
+def ts_query(text: str):
+
+    # websearch_to_tsquery accepts user input: quoted phrases, OR, -word
+    return func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), text)
+
+def search_condition(text: str):
+
+    if not FULL_TEXT:
+        # Every word has to occur in the body
+        return and_(*[Request.request.icontains(word, autoescape=True) for word in text.split()])
+
+    condition = search_vector.op("@@")(ts_query(text))
+    if SEARCH_TRIGRAM:
+        condition = or_(condition, Request.request.op("%>")(text), Request.request.icontains(text, autoescape=True))
+    return condition
+
+def search_rank(text: str):
+
+    if not FULL_TEXT:
+        return literal(0.0, Float)
+
+    rank = func.ts_rank_cd(search_vector, ts_query(text), type_=Float)
+    if SEARCH_TRIGRAM:
+        rank = rank + func.word_similarity(text, Request.request, type_=Float)
+    return rank
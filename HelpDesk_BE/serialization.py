@@ -0,0 +1,63 @@
+import os
+from typing import List, Optional, Type
+import orjson
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy import func
+
+# Fast path for list responses: rows are selected as plain columns, trusted as they
+# come from the database and encoded with orjson, instead of validating an ORM
+# object per row with the response model and encoding it with the json module.
+# The response models stay on the routes for the OpenAPI schema.
+
+# Summary mode of the list endpoints: the ticket body is not selected, only its first
+# characters as request_preview. The full text comes from the single request endpoints
+REQUEST_PREVIEW_LENGTH = int(os.getenv("REQUEST_PREVIEW_LENGTH", "120"))
+PREVIEW_FIELD = "request_preview"
+
+def parse_fields(model: Type[BaseModel], fields: Optional[str]) -> List[str]:
+
+    # `fields` is a comma separated subset of the model's fields, id is always returned
+    names = list(model.model_fields)
+    if not fields:
+        return names
+    wanted = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = wanted - set(names)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return [name for name in names if name in wanted or name == "id"]
+
+def model_columns(entity, model: Type[BaseModel], fields: Optional[str] = None, summary: bool = False) -> list:
+
+    # The columns of `entity` that `model` exposes, in the model's field order.
+    # In summary mode the request text is cut in the database, one character more
+    # than the preview tells request_previews whether there was more
+    columns = []
+    for name in parse_fields(model, fields):
+        if name == "request" and summary:
+            columns.append(func.substr(entity.request, 1, REQUEST_PREVIEW_LENGTH + 1).label(PREVIEW_FIELD))
+        else:
+            columns.append(getattr(entity, name))
+    return columns
+
+def request_previews(rows: List[dict]) -> List[dict]:
+
+    for row in rows:
+        preview = row.get(PREVIEW_FIELD)
+        if preview is not None and len(preview) > REQUEST_PREVIEW_LENGTH:
+            row[PREVIEW_FIELD] = preview[:REQUEST_PREVIEW_LENGTH].rstrip() + "…"
+    return rows
+
+def json_response(content, response: Response) -> Response:
+
+    # Returning a Response skips the injected one, carry its headers (cursor, ETag, ...) over.
+    # Enums encode as their values and UTC datetimes with "Z", as the response models do
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return Response(
+        orjson.dumps(content, option=orjson.OPT_UTC_Z),
+        media_type="application/json",
+        headers=headers
+    )
@@ -0,0 +1,131 @@
+import os
+import random
+from collections import Counter
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import Select, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from classes.Request import Request
+from classes.RequestStat import RequestStat
+from database import dialect_insert
+from queries import with_archived
+from Enums import RequestTypes, RequestStatus, RequestPriorityTypes
+
+# Ticket counts per status, priority, type and viewed flag. Every write path applies
+# its delta in its own transaction, so the counters commit or roll back with the rows.
+# Archived requests stay counted. `manage.py reconcile-stats` rebuilds the counters
+# from the requests and archived_requests tables.
+
+# Each transaction adds to one random slot, readers sum the slots
+STATS_SLOTS = int(os.getenv("STATS_SLOTS", "8"))
+
+DIMENSIONS = ("type", "status", "priority", "viewed")
+TOTAL_KEY = ("total", "all")
+
+StatKey = Tuple[str, str]
+
+def stat_value(value) -> str:
+
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value.name
+
+def request_keys(request) -> List[StatKey]:
+
+    # `request` is a Request or a row mapping
+    get = request.get if isinstance(request, Mapping) else lambda field: getattr(request, field)
+    return [TOTAL_KEY] + [(dimension, stat_value(get(dimension))) for dimension in DIMENSIONS]
+
+def created(requests: Iterable) -> Counter:
+
+    delta = Counter()
+    for request in requests:
+        for key in request_keys(request):
+            delta[key] += 1
+    return delta
+
+def changed(dimension: str, old, new) -> Counter:
+
+    delta = Counter()
+    if old != new:
+        delta[(dimension, stat_value(old))] -= 1
+        delta[(dimension, stat_value(new))] += 1
+    return delta
+
+async def apply_delta(db: AsyncSession, delta: Counter):
+
+    # Upsert in key order so concurrent writers lock counter rows in the same order
+    slot = random.randrange(STATS_SLOTS)
+    rows = [
+        {"dimension": dimension, "value": value, "slot": slot, "count": count}
+        for (dimension, value), count in sorted(delta.items()) if count
+    ]
+    if not rows:
+        return
+
+    query = dialect_insert(db.bind.dialect.name)(RequestStat)
+    await db.execute(
+        query.on_conflict_do_update(
+            index_elements=[RequestStat.dimension, RequestStat.value, RequestStat.slot],
+            set_={"count": RequestStat.count + query.excluded.count}
+        ),
+        rows
+    )
+
+def stats_query() -> Select:
+
+    return select(RequestStat.dimension, RequestStat.value, func.sum(RequestStat.count)).group_by(
+        RequestStat.dimension, RequestStat.value
+    )
+
+def counted_query() -> Select:
+
+    # At most one row per combination of the dimensions, counted from live and archived requests
+    columns = [getattr(Request, dimension) for dimension in DIMENSIONS]
+    return with_archived(select(*columns, func.count()).group_by(*columns))
+
+def stats_response(counts: Dict[StatKey, int]) -> dict:
+
+    # Every enum member is listed, also the ones without requests
+    return {
+        "total": counts.get(TOTAL_KEY, 0),
+        "status": {member.value: counts.get(("status", member.name), 0) for member in RequestStatus},
+        "priority": {member.value: counts.get(("priority", member.name), 0) for member in RequestPriorityTypes},
+        "type": {member.value: counts.get(("type", member.name), 0) for member in RequestTypes},
+        "viewed": {flag: counts.get(("viewed", stat_value(flag)), 0) for flag in (False, True)},
+    }
+
+async def read_stats(db: AsyncSession) -> dict:
+
+    rows = (await db.execute(stats_query())).all()
+    return stats_response({(dimension, value): int(count) for dimension, value, count in rows})
+
+def reconcile_stats(db: Session, dry_run: bool = False) -> Dict[StatKey, Tuple[int, int]]:
+
+    # Recount the requests, archived ones included. Returns {key: (stored, actual)} for every key that drifted.
+    # Writers are blocked meanwhile on PostgreSQL so no delta lands between the count and the rewrite.
+    if db.get_bind().dialect.name == "postgresql":
+        db.connection().exec_driver_sql("LOCK TABLE requests, archived_requests IN SHARE MODE")
+
+    actual = Counter()
+    for *values, count in db.execute(counted_query()).all():
+        row = dict(zip(DIMENSIONS, values))
+        for key in request_keys(row):
+            actual[key] += count
+
+    stored = Counter({(dimension, value): int(count) for dimension, value, count in db.execute(stats_query()).all()})
+
+    drift = {
+        key: (stored.get(key, 0), actual.get(key, 0))
+        for key in sorted(set(stored) | set(actual))
+        if stored.get(key, 0) != actual.get(key, 0)
+    }
+
+    if not dry_run:
+        db.execute(delete(RequestStat))
+        rows = [{"dimension": dimension, "value": value, "slot": 0, "count": count} for (dimension, value), count in actual.items()]
+        if rows:
+            db.execute(insert(RequestStat), rows)
+    db.commit()
+    return drift
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import uuid
+
+# Settings are read when the app modules are imported: point them at a throwaway
+# SQLite file (aiosqlite for the API, migrated on import of main) before importing
+TEST_DB_DIR = tempfile.mkdtemp(prefix="helpdesk-tests-")
+os.environ["DB_URL"] = f"sqlite:///{TEST_DB_DIR}/helpdesk.db"
+os.environ["DB_REPLICA_URL"] = ""
+os.environ["EVENTS_BACKEND"] = "memory"
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+# Cheap hashes, no background archiving of the test tickets
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["ARCHIVE_AFTER_DAYS"] = "0"
+# Viewed marks stay pending until a test flushes them
+os.environ["VIEWED_FLUSH_SECONDS"] = "3600"
+
+import pytest
+from fastapi.testclient import TestClient
+import main
+
+
+@pytest.fixture(scope="session")
+def client():
+
+    # One app with its lifespan (viewed buffer, jobs, hash pool) for the whole run
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def signup(client):
+
+    # Returns auth headers of a new user; @support addresses become support users
+    def create(support: bool = False) -> dict:
+        email = f"user-{uuid.uuid4().hex[:12]}@{'support' if support else 'example'}.com"
+        response = client.post("/auth/signup", json={"name": email.split("@")[0], "email": email, "password": "password"})
+        assert response.status_code == 200, response.text
+        response = client.post("/auth/login", json={"email": email, "password": "password"})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return create
+
+@pytest.fixture
+def client_headers(signup):
+
+    return signup()
+
+@pytest.fixture
+def support_headers(signup):
+
+    return signup(support=True)
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+from sqlalchemy import delete
+import auth
+from classes.User import User
+from database import AsyncSessionLocal
+
+
+def me(client, headers) -> int:
+
+    return client.get("/auth/me", headers=headers).status_code
+
+def expire_principals():
+
+    # What another worker, or this one after PRINCIPAL_CACHE_TTL_SECONDS, starts from
+    auth.principal_cache.clear()
+
+def email_of(client, headers) -> str:
+
+    return client.get("/auth/me", headers=headers).json()["email"]
+
+
+def test_revoke_user_rejects_cached_tokens(client, signup):
+
+    headers, other = signup(), signup()
+    user_id = client.get("/auth/me", headers=headers).json()["id"]
+    assert me(client, headers) == 200
+
+    async def revoke():
+        async with AsyncSessionLocal() as db:
+            await auth.revoke_user(db, user_id)
+            await db.commit()
+
+    # Cached principal dropped at commit, no waiting for the cache to expire
+    client.portal.call(revoke)
+    assert me(client, headers) == 401
+    assert me(client, other) == 200
+
+
+def test_manage_revoke_user_reaches_other_processes(client, signup):
+
+    headers = signup()
+    email = email_of(client, headers)
+    # Cached in this process, revoked from another one
+    assert me(client, headers) == 200
+    result = subprocess.run(
+        [sys.executable, "manage.py", "revoke-user", email],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+    expire_principals()
+    assert me(client, headers) == 401
+
+
+def test_deleted_user_is_rejected(client, signup):
+
+    headers = signup()
+    email = email_of(client, headers)
+
+    async def delete_user():
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.email == email))
+            await db.commit()
+
+    client.portal.call(delete_user)
+    expire_principals()
+    assert me(client, headers) == 401
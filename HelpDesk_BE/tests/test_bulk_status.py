@@ -0,0 +1,33 @@
+from routes import supportUserRoute
+
+
+def test_filter_must_select_something(client, support_headers):
+
+    for body in ({"status": 2, "filter": {}}, {"status": 2, "filter": {"status": None}}):
+        assert client.put("/support/requests/status", json=body, headers=support_headers).status_code == 400
+    # Misspelled fields are rejected, not dropped
+    response = client.put("/support/requests/status", json={"status": 2, "filter": {"statuss": 0}}, headers=support_headers)
+    assert response.status_code == 422
+
+
+def test_filter_updates_in_capped_batches(client, client_headers, support_headers, monkeypatch):
+
+    monkeypatch.setattr(supportUserRoute, "MAX_BULK_REQUESTS", 2)
+    ids = [
+        client.post("/client/request/", json={"type": 2, "request": f"bulk {index}", "priority": 0}, headers=client_headers).json()["id"]
+        for index in range(5)
+    ]
+    body = {"status": 2, "filter": {"type": 2, "status": 0}}
+
+    batches = []
+    while True:
+        response = client.put("/support/requests/status", json=body, headers=support_headers)
+        assert response.status_code == 200, response.text
+        batches.append([result["id"] for result in response.json()["results"]])
+        if not response.json()["has_more"]:
+            break
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert sorted(sum(batches, [])) == ids
+    statuses = {row["id"]: row["status"] for row in client.get("/client/my-requests/", headers=client_headers).json()}
+    assert all(statuses[request_id] == 2 for request_id in ids)
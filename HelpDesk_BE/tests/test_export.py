@@ -0,0 +1,25 @@
+import json
+from viewed import viewed_buffer
+
+
+def exported_ids(client, headers, **params):
+
+    response = client.get("/support/requests/export", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return {json.loads(line)["id"]: json.loads(line)["viewed"] for line in response.text.splitlines()}
+
+
+def test_export_applies_pending_viewed_marks_with_the_filter(client, client_headers, support_headers):
+
+    ticket = client.post("/client/request/", json={"type": 1, "request": "export me", "priority": 0}, headers=client_headers).json()
+    assert exported_ids(client, support_headers, viewed=False)[ticket["id"]] is False
+
+    # Opened by support: the mark is still pending in the buffer
+    client.get(f"/support/request/{ticket['id']}", headers=support_headers)
+    assert viewed_buffer.is_viewed(ticket["id"])
+
+    assert ticket["id"] not in exported_ids(client, support_headers, viewed=False)
+    assert exported_ids(client, support_headers)[ticket["id"]] is True
+
+    client.portal.call(viewed_buffer.flush)
+    assert exported_ids(client, support_headers, viewed=True)[ticket["id"]] is True
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import signal
+import time
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from hashing import HashPool
+
+
+def test_cancelled_awaiter_keeps_the_job_counted_until_it_is_done():
+
+    async def scenario():
+
+        pool = HashPool(size=1, queue_limit=0)
+        try:
+            # Start the worker process first, spawning is slower than the job below
+            assert await pool.run(abs, -1) == 1
+            await asyncio.sleep(0.1)
+
+            task = asyncio.create_task(pool.run(time.sleep, 1))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            await asyncio.sleep(0)
+            assert task.cancelled()
+
+            # The job is still running in the worker, so there is no room for another one
+            assert pool.pending == 1
+            deadline = time.monotonic() + 10
+            while pool.pending and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            assert pool.pending == 0
+        finally:
+            pool.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_pool_recovers_after_a_worker_dies():
+
+    async def scenario():
+
+        pool = HashPool(size=1, queue_limit=0)
+        try:
+            worker = await pool.run(os.getpid)
+            os.kill(worker, signal.SIGKILL)
+            await asyncio.sleep(0.5)
+
+            # The broken executor is replaced, the job runs in a new worker
+            assert await pool.run(abs, -2) == 2
+            assert await pool.run(os.getpid) != worker
+
+            # A job that kills every worker it gets fails after the one retry, the pool still recovers
+            with pytest.raises(BrokenProcessPool):
+                await pool.run(os._exit, 1)
+            assert await pool.run(abs, -3) == 3
+        finally:
+            pool.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,37 @@
+import asyncio
+import httpx
+import main
+
+
+def test_concurrent_claims_hand_out_each_ticket_once(client, signup):
+
+    owner = signup()
+    agents = [signup(support=True) for _ in range(5)]
+    # The queue is shared, close the tickets other tests left pending so only ours are in it
+    while True:
+        response = client.put("/support/requests/status", json={"status": 2, "filter": {"status": 0}}, headers=agents[0])
+        assert response.status_code == 200, response.text
+        if not response.json()["has_more"]:
+            break
+    tickets = []
+    for index in range(12):
+        response = client.post("/client/request/", json={"type": 0, "request": f"queue ticket {index}", "priority": index % 3}, headers=owner)
+        assert response.status_code == 200, response.text
+        tickets.append(response.json()["id"])
+
+    async def claim_all():
+        # More claims than tickets, all in flight at once on the app's event loop
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*[
+                http.post("/support/queue/next", headers=agents[index % len(agents)])
+                for index in range(len(tickets) + 8)
+            ])
+
+    responses = client.portal.call(claim_all)
+
+    assert all(response.status_code in (200, 204) for response in responses)
+    claimed = [response.json()["id"] for response in responses if response.status_code == 200]
+    assert len(claimed) == len(set(claimed))
+    assert sorted(claimed) == tickets
+    assert client.post("/support/queue/next", headers=agents[0]).status_code == 204
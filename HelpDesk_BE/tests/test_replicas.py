@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import replicas
+from conftest import TEST_DB_DIR
+from database import Base
+
+
+@pytest.fixture
+def stale_replica(monkeypatch):
+
+    # An empty database standing in for a replica that has not caught up at all
+    url = f"sqlite:///{TEST_DB_DIR}/stale-replica.db"
+    Base.metadata.create_all(create_engine(url))
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+    monkeypatch.setattr(replicas, "ReplicaSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(replicas.replica_router, "engine", engine)
+    monkeypatch.setattr(replicas.replica_router, "healthy", True)
+
+
+def my_request_ids(client, headers):
+
+    return [row["id"] for row in client.get("/client/my-requests/", headers=headers).json()]
+
+
+def test_last_write_pins_reads_to_the_primary(client, client_headers, stale_replica):
+
+    created = client.post("/client/request/", json={"type": 0, "request": "read my write", "priority": 0}, headers=client_headers)
+    last_write = created.headers[replicas.LAST_WRITE_HEADER]
+    assert replicas.LAST_WRITE_HEADER not in client.get("/client/my-requests/", headers=client_headers).headers
+
+    # No worker remembers the write: the client's header alone decides, on any worker
+    assert my_request_ids(client, {**client_headers, replicas.LAST_WRITE_HEADER: last_write}) == [created.json()["id"]]
+    assert my_request_ids(client, client_headers) == []
+
+    # Older writes are left to the replica
+    expired = str(float(last_write) - replicas.REPLICA_STICKY_SECONDS - 1)
+    assert my_request_ids(client, {**client_headers, replicas.LAST_WRITE_HEADER: expired}) == []
+    assert my_request_ids(client, {**client_headers, replicas.LAST_WRITE_HEADER: "nan"}) == []
@@ -0,0 +1,75 @@
+from pagination import DEFAULT_PAGE_SIZE
+
+
+def create_ticket(client, headers, text="The export page times out", type=0, priority=1):
+
+    response = client.post("/client/request/", json={"type": type, "request": text, "priority": priority}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_client_sees_only_own_tickets(client, signup):
+
+    owner, other = signup(), signup()
+    ticket = create_ticket(client, owner)
+
+    assert [row["id"] for row in client.get("/client/my-requests/", headers=owner).json()] == [ticket["id"]]
+    assert client.get(f"/client/request/{ticket['id']}", headers=owner).json()["request"] == ticket["request"]
+    assert client.get(f"/client/request/{ticket['id']}", headers=other).status_code == 404
+
+
+def test_support_requires_support_user(client, client_headers, support_headers):
+
+    assert client.get("/support/requests/", headers=client_headers).status_code == 403
+    assert client.get("/support/requests/", headers=support_headers).status_code == 200
+
+
+def page_ids(client, path, headers, **params):
+
+    # Follows X-Next-Cursor one ticket at a time
+    ids, cursor = [], None
+    while True:
+        response = client.get(path, params={**params, "limit": 1, **({"cursor": cursor} if cursor else {})}, headers=headers)
+        assert response.status_code == 200, response.text
+        ids += [row["id"] for row in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return ids
+
+
+def test_priority_sorts_in_declaration_order(client, client_headers):
+
+    # Names would sort MIDDLE > IMPORTANT > CAN_WAIT
+    tickets = {priority: create_ticket(client, client_headers, priority=priority)["id"] for priority in (1, 2, 0, 2)}
+    important, middle, can_wait = tickets[2], tickets[1], tickets[0]
+
+    descending = client.get("/client/my-requests/", params={"sort_by": "priority"}, headers=client_headers).json()
+    assert [row["priority"] for row in descending] == [2, 2, 1, 0]
+    assert [row["id"] for row in descending][2:] == [middle, can_wait]
+    assert important in [row["id"] for row in descending][:2]
+
+    for sort_order in ("asc", "desc"):
+        full = [row["id"] for row in client.get(
+            "/client/my-requests/", params={"sort_by": "priority", "sort_order": sort_order}, headers=client_headers
+        ).json()]
+        assert page_ids(client, "/client/my-requests/", client_headers, sort_by="priority", sort_order=sort_order) == full
+
+
+def test_lists_are_paged_by_default(client, signup):
+
+    owner = signup()
+    ids = [create_ticket(client, owner, text=f"Ticket {n}")["id"] for n in range(DEFAULT_PAGE_SIZE + 1)]
+
+    first = client.get("/client/my-requests/", headers=owner)
+    assert len(first.json()) == DEFAULT_PAGE_SIZE
+    rest = client.get("/client/my-requests/", params={"cursor": first.headers["x-next-cursor"]}, headers=owner)
+    assert "x-next-cursor" not in rest.headers
+    assert sorted(row["id"] for row in first.json() + rest.json()) == ids
+
+
+def test_invalid_filter_values_are_rejected(client, client_headers, support_headers):
+
+    for path, headers in (("/client/my-requests/", client_headers), ("/support/requests/", support_headers)):
+        for name in ("type", "status", "priority"):
+            response = client.get(path, params={name: 9}, headers=headers)
+            assert response.status_code == 400, response.text
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from typing import Iterable, List, Optional, Set
+from sqlalchemy import update
+from classes.Request import Request
+from database import AsyncSessionLocal
+from etags import bump_versions, request_scopes
+from events import publish_request_events
+from stats import apply_delta, changed
+
+logger = logging.getLogger(__name__)
+
+# Write-behind buffer for the viewed flag. Opening a ticket only marks it here; the
+# marks are written in one batched UPDATE per interval and at shutdown. Stats,
+# ETag versions and viewed events follow at flush time. Reads of this worker
+# overlay the pending marks, other workers see them after the next flush.
+
+VIEWED_FLUSH_SECONDS = float(os.getenv("VIEWED_FLUSH_SECONDS", "1"))
+
+FLUSH_BATCH_SIZE = 1000
+
+
+class ViewedBuffer:
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.pending: Set[int] = set()
+        # Marks taken by a flush that has not committed yet, still overlaid
+        self.flushing: Set[int] = set()
+        self._task = None
+
+    def mark(self, request_id: int):
+
+        self.pending.add(request_id)
+
+    def is_viewed(self, request_id: int) -> bool:
+
+        return request_id in self.pending or request_id in self.flushing
+
+    def overlay(self, rows: List[dict], viewed: Optional[bool] = None) -> List[dict]:
+
+        # `rows` are dicts with id and maybe viewed; `viewed` is the list's viewed filter
+        if not self.pending and not self.flushing:
+            return rows
+        if viewed is False:
+            rows = [row for row in rows if not self.is_viewed(row["id"])]
+        for row in rows:
+            if "viewed" in row and self.is_viewed(row["id"]):
+                row["viewed"] = True
+        return rows
+
+    async def flush(self):
+
+        if not self.pending:
+            return
+        self.flushing, self.pending = self.pending, set()
+        try:
+            ids = sorted(self.flushing)
+            for start in range(0, len(ids), FLUSH_BATCH_SIZE):
+                await self._write(ids[start:start + FLUSH_BATCH_SIZE])
+        except BaseException:
+            # Keep the marks for the next flush, also when cancelled at shutdown.
+            # Marks already written are skipped by the viewed = false condition
+            self.pending |= self.flushing
+            raise
+        finally:
+            self.flushing = set()
+
+    async def _write(self, ids: Iterable[int]):
+
+        async with AsyncSessionLocal() as db:
+            # Rows flipped meanwhile by another worker are skipped and counted once
+            rows = (await db.execute(
+                update(Request)
+                .where(Request.id.in_(list(ids)), Request.viewed.is_(False))
+                .values(viewed=True)
+                .returning(*Request.__table__.columns)
+                .execution_options(synchronize_session=False)
+            )).mappings().all()
+            if rows:
+                delta = Counter()
+                for _ in rows:
+                    delta.update(changed("viewed", False, True))
+                await apply_delta(db, delta)
+                owners = await publish_request_events(db, "request.viewed", rows)
+                await bump_versions(db, request_scopes(owners.values()))
+            await db.commit()
+
+    async def _run(self):
+
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Flushing viewed marks failed, retrying on the next interval")
+
+    async def start(self):
+
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+viewed_buffer = ViewedBuffer(interval=VIEWED_FLUSH_SECONDS)